@@ -0,0 +1,237 @@
+"""
+图表生成流水线基准：用模拟的 session.model.llm 驱动 Json2chartTool，按阶段分别测量耗时、吞吐量和峰值内存。
+
+阶段：
+  parse      _parse_chart_data_text 解析 chart_data 文本
+  table      _build_table 构建列式中间表
+  plan       字段概况 + 大模型规划（模拟的流式响应）
+  build      各图表类型的生成函数（每种图表一条记录）
+  unit       _apply_value_unit 单位换算/百分比归一化
+  serialize  最终 JSON 序列化
+  invoke_cold  _invoke 端到端，每次执行前清空配置参数缓存，走大模型规划
+  invoke_warm  _invoke 端到端，配置参数缓存命中，跳过大模型规划
+
+每条测量结果输出为一行 JSON（JSON Lines），便于在各插件版本之间对比回归。
+需要在安装了插件依赖（dify_plugin 等）的环境中运行：
+
+    python benchmarks/pipeline.py --rows 10,1000,100000 --cols 2,20 --output results.jsonl
+"""
+import argparse
+import copy
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Any, Callable
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tools.json2chart import Json2chartTool  # noqa: E402
+from utils.registry import chart_types, get_spec  # noqa: E402
+from utils.serializer import dumps, get_backend  # noqa: E402
+
+_GROUP_COUNT = 10
+
+
+class StubLLM:
+    """按 Dify 流式响应的结构逐段返回固定的图表配置，不访问任何模型服务"""
+
+    def __init__(self, plan: dict[str, Any], chunk_size: int = 16):
+        self.text = json.dumps(plan, ensure_ascii=False)
+        self.chunk_size = chunk_size
+
+    def invoke(self, model_config=None, prompt_messages=None, stream=False, **kwargs):
+        chunks = [self.text[i:i + self.chunk_size] for i in range(0, len(self.text), self.chunk_size)]
+        if not stream:
+            return SimpleNamespace(message=SimpleNamespace(content=self.text))
+        return (SimpleNamespace(delta=SimpleNamespace(message=SimpleNamespace(content=chunk))) for chunk in chunks)
+
+
+def make_tool(plan: dict[str, Any]) -> Json2chartTool:
+    tool = Json2chartTool.__new__(Json2chartTool)
+    tool.session = SimpleNamespace(model=SimpleNamespace(llm=StubLLM(plan)))
+    return tool
+
+
+def make_records(rows: int, cols: int, grouped: bool, seed: int = 0) -> tuple[list[dict[str, Any]], list[str]]:
+    """生成模拟数据：一个类别字段（分组时另加一个分组字段）和若干数值字段，共 cols 列"""
+    rng = random.Random(seed)
+    metric_count = max(cols - (2 if grouped else 1), 1)
+    metrics = [f"指标{i}" for i in range(metric_count)]
+    categories = max(rows // _GROUP_COUNT, 1) if grouped else rows
+    records = []
+    for i in range(rows):
+        record = {"名称": f"类别{i % categories}"}
+        if grouped:
+            record["分组"] = f"分组{i // categories % _GROUP_COUNT}"
+        for metric in metrics:
+            record[metric] = round(rng.random() * 100000, 2)
+        records.append(record)
+    return records, metrics
+
+
+def measure(func: Callable[..., Any], repeat: int, memory: bool, setup: Callable[[], Any] | None = None) -> dict[str, Any]:
+    """
+    多次执行取耗时中位数，另执行一次测量峰值内存（tracemalloc 会拖慢执行，不计入耗时）。
+    setup 不为空时每次执行前调用，其返回值作为 func 的参数，耗时不计入结果。
+    """
+    timings = []
+    for _ in range(repeat):
+        argument = setup() if setup is not None else None
+        gc.collect()
+        started = time.perf_counter()
+        func(argument) if setup is not None else func()
+        timings.append(time.perf_counter() - started)
+    result = {
+        "latency_ms": round(statistics.median(timings) * 1000, 3),
+        "min_ms": round(min(timings) * 1000, 3),
+        "repeat": repeat,
+    }
+    if memory:
+        gc.collect()
+        argument = setup() if setup is not None else None
+        tracemalloc.start()
+        try:
+            func(argument) if setup is not None else func()
+            result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def chart_arguments(chart_type: str, name_key: str, metrics: list[str], group_key: str | None) -> dict[str, Any] | None:
+    """为每种图表挑选字段；数值字段不足时返回 None 跳过该图表"""
+    spec = get_spec(chart_type)
+    if len(metrics) < max(spec.min_value_keys, 2 if chart_type in ("散点图", "双轴图") else 1):
+        return None
+    if group_key and not spec.supports_group_key:
+        return None
+    value_keys = metrics[:max(spec.min_value_keys, 2 if chart_type == "散点图" else 3)]
+    return {
+        "name_key": name_key,
+        "title": f"{chart_type}基准",
+        "value_keys": value_keys,
+        "series_names": value_keys,
+        "group_key": group_key,
+        "bar_value_keys": metrics[:1],
+        "line_value_keys": metrics[1:2],
+        "bar_names": metrics[:1],
+        "line_names": metrics[1:2],
+        "downsample": "lttb",
+        "max_points": 2000,
+        "large_threshold": 5000,
+        "keep_names": False,
+        "use_dataset": False,
+    }
+
+
+def run_case(rows: int, cols: int, grouped: bool, repeat: int, memory: bool, emit: Callable[[dict[str, Any]], None]) -> None:
+    records, metrics = make_records(rows, cols, grouped)
+    group_key = "分组" if grouped else None
+    chart_data = json.dumps(records, ensure_ascii=False)
+    del records
+    case = {"rows": rows, "cols": cols, "group_key": grouped, "input_bytes": len(chart_data.encode("utf-8"))}
+
+    plan = {"chart_type": "柱状图", "chart_title": "基准", "name_key": "名称", "value_keys": metrics[:3], "series_names": metrics[:3]}
+    if group_key:
+        plan["group_key"] = group_key
+    tool = make_tool(plan)
+    options = tool._read_render_options({})
+
+    def emit_stage(stage: str, result: dict[str, Any], **extra: Any) -> None:
+        seconds = result["latency_ms"] / 1000
+        emit({**case, "stage": stage, **extra, **result, "rows_per_s": round(rows / seconds) if seconds else None})
+
+    parsed = tool._parse_chart_data_text(chart_data)
+    emit_stage("parse", measure(lambda: tool._parse_chart_data_text(chart_data), repeat, memory))
+    table = tool._build_table(parsed)
+    emit_stage("table", measure(lambda: tool._build_table(parsed), repeat, memory))
+    del parsed
+
+    # _request_chart_plan 本身不读写配置参数缓存，每次都经过模拟的大模型调用
+    emit_stage("plan", measure(lambda: tool._request_chart_plan({}, "柱状图", None, None, tool._describe_table(table, {})), repeat, memory))
+
+    for metric in metrics:
+        table.coerce_numeric(metric)
+    for chart_type in chart_types():
+        arguments = chart_arguments(chart_type, "名称", metrics, group_key)
+        if arguments is None:
+            continue
+        spec = get_spec(chart_type)
+        config = spec.build(table, **arguments)
+        emit_stage("build", measure(lambda: spec.build(table, **arguments), repeat, memory), chart_type=chart_type)
+
+        emit_stage(
+            "unit",
+            measure(lambda fresh: tool._apply_value_unit(fresh, options["value_unit"]), repeat, memory, setup=lambda: copy.deepcopy(config)),
+            chart_type=chart_type,
+        )
+        tool._apply_value_unit(config, options["value_unit"])
+        output = dumps(config)
+        emit_stage("serialize", measure(lambda: dumps(config), repeat, memory), chart_type=chart_type, output_bytes=len(output.encode("utf-8")))
+
+    invoke_parameters = {"chart_data": chart_data, "model": {}, "chart_type": "柱状图", "local_plan_threshold": 1.01}
+    # 冷路径：清空缓存不计入耗时；热路径：先执行一次写入缓存，之后每次都命中
+    emit_stage("invoke_cold", measure(lambda _: list(tool._invoke(invoke_parameters)), repeat, memory, setup=tool._plan_cache.clear))
+    list(tool._invoke(invoke_parameters))
+    emit_stage("invoke_warm", measure(lambda: list(tool._invoke(invoke_parameters)), repeat, memory))
+
+
+def plugin_version() -> str | None:
+    with open(os.path.join(ROOT, "manifest.yaml"), encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("version:"):
+                return line.split(":", 1)[1].strip()
+    return None
+
+
+def parse_sizes(text: str) -> list[int]:
+    return [int(float(part)) for part in text.split(",") if part.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="按阶段测量图表生成流水线的性能，输出 JSON Lines")
+    parser.add_argument("--rows", default="10,1000,100000,1000000", help="逗号分隔的行数列表")
+    parser.add_argument("--cols", default="2,20,200", help="逗号分隔的列数列表")
+    parser.add_argument("--group", choices=("both", "yes", "no"), default="both", help="是否带 group_key")
+    parser.add_argument("--repeat", type=int, default=3, help="每个阶段重复次数，取中位数")
+    parser.add_argument("--max-cells", type=float, default=2e7, help="跳过行数 × 列数超过该值的组合")
+    parser.add_argument("--no-memory", action="store_true", help="不测量峰值内存")
+    parser.add_argument("--output", help="结果写入该文件（默认输出到标准输出）")
+    args = parser.parse_args()
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    environment = {
+        "plugin_version": plugin_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "json_backend": get_backend(),
+    }
+
+    def emit(record: dict[str, Any]) -> None:
+        output.write(json.dumps({**record, **environment}, ensure_ascii=False) + "\n")
+        output.flush()
+
+    groups = {"both": (False, True), "yes": (True,), "no": (False,)}[args.group]
+    try:
+        for rows in parse_sizes(args.rows):
+            for cols in parse_sizes(args.cols):
+                if rows * cols > args.max_cells:
+                    print(f"跳过 rows={rows} cols={cols}：超过 --max-cells", file=sys.stderr)
+                    continue
+                for grouped in groups:
+                    run_case(rows, cols, grouped, args.repeat, not args.no_memory, emit)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
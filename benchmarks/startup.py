@@ -0,0 +1,55 @@
+"""
+插件冷启动耗时基准：每轮在新的 Python 进程中测量
+  import   导入 tools.json2chart（插件进程启动时 main.py 加载工具的开销）
+  first    首次生成一个柱状图（触发图表模块的按需导入）
+并记录导入后是否已经加载了 pandas。需要在安装了插件依赖（dify_plugin 等）的环境中运行：
+
+    python benchmarks/startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import tools.json2chart
+imported = time.perf_counter()
+pandas_loaded = "pandas" in sys.modules
+from utils.registry import get_builder
+get_builder("柱状图")([{"name": "A", "value": 1}, {"name": "B", "value": 2}], name_key="name", value_keys=["value"])
+first = time.perf_counter()
+print(json.dumps({"import": imported - started, "first": first - imported, "pandas_loaded": pandas_loaded}))
+"""
+
+
+def run_probe() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="测量插件冷启动耗时")
+    parser.add_argument("--runs", type=int, default=10, help="测量轮数，每轮一个新进程")
+    args = parser.parse_args()
+
+    samples = [run_probe() for _ in range(args.runs)]
+    for field in ("import", "first"):
+        values = [sample[field] * 1000 for sample in samples]
+        print(f"{field:>6}: 中位数 {statistics.median(values):.1f} ms, 最小 {min(values):.1f} ms, 最大 {max(values):.1f} ms")
+    print(f"pandas 在导入阶段被加载: {any(sample['pandas_loaded'] for sample in samples)}")
+
+
+if __name__ == "__main__":
+    main()
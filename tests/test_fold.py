@@ -0,0 +1,19 @@
+from utils.columnar import ColumnarTable
+from utils.fold import OTHER_NAME, fold_table
+
+
+def test_fold_table_appends_other():
+    rows = [{"n": f"c{i}", "v": i} for i in range(10)]
+    table, folded = fold_table(ColumnarTable.from_data(rows), "n", ["v"], 3)
+    assert folded
+    assert table.values("n") == ["c8", "c9", OTHER_NAME]
+    assert table.values("v") == [8, 9, 28]
+
+
+def test_fold_table_merges_existing_other():
+    # 原数据已有“其他”类别时并入折叠结果，不能出现两个同名类别
+    rows = [{"n": OTHER_NAME, "v": 100}] + [{"n": f"c{i}", "v": i} for i in range(10)]
+    table, folded = fold_table(ColumnarTable.from_data(rows), "n", ["v"], 3)
+    assert folded
+    assert table.values("n") == ["c8", "c9", OTHER_NAME]
+    assert table.values("v") == [8, 9, 128]
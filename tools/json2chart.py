@@ -6,27 +6,65 @@ from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
 import json
 import ast
+import logging
 import re
-from utils.pie import generate_echarts_pie
-from utils.line import generate_echarts_line
-from utils.bar import generate_echarts_bar
-from utils.radar import generate_echarts_radar
-from utils.funnel import generate_echarts_funnel
-from utils.scatter import generate_echarts_scatter
-from utils.donut import generate_echarts_donut
-from utils.dual_axis import generate_echarts_dual_axis
-from utils.stacked_bar import generate_echarts_stacked_bar
+import threading
+import time
+from utils.plan_cache import PlanCache, build_plan_cache_key
+from utils.registry import chart_types, get_spec
+from utils.planner import plan_chart_locally
+from utils.columnar import ColumnarTable
+from utils.stream_parser import detect_stream_mode, iter_array_items
+from utils.serializer import dumps, loads
+from utils.budget import fit_output_budget
+from utils.executor import call_with_deadline, ordered_map
+from utils.formatter import add_percent_to_formatter, add_unit_to_formatter
+from utils.json_scanner import JsonObjectScanner
+from utils.metrics import NULL_METRICS, start_request
+from utils.profile import render_profile
+from utils.profiling import profile_request
+from utils.prompts import (
+    BATCH_PLAN_SYSTEM_PROMPT,
+    CHART_PLAN_SYSTEM_PROMPT,
+    PROMPT_VERSION,
+    batch_plan_user_prompt,
+    chart_plan_user_prompt,
+)
 
 
 from dify_plugin.entities.model.llm import LLMModelConfig
 from dify_plugin.entities.model.message import SystemPromptMessage, UserPromptMessage
-import pandas as pd
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
 
 class Json2chartTool(Tool):
     _PERCENT_HINTS = ("%", "百分比", "占比", "比率", "率", "rate", "ratio", "pct", "percent")
-    _FORMATTER_TOKENS = ("{c}", "{c0}", "{c1}", "{c2}", "{c[0]}", "{c[1]}", "{c[2]}")
-    _SINGLE_ROW_WIDE_TABLE_CHART_TYPES = {"饼状图", "环形图", "柱状图", "折线图", "雷达图", "漏斗图", "堆叠柱状图"}
-    _SUPPORTED_CHART_TYPES = ("饼状图", "柱状图", "折线图", "雷达图", "漏斗图", "散点图", "环形图", "双轴图", "堆叠柱状图")
+    _COMMON_NAME_KEYS = ("name", "名称", "类别", "category", "label", "项目", "月份", "日期", "时间")
+    # 本地规则规划的置信度阈值，高于该值且用户指定了图表类型时不再调用大模型
+    _LOCAL_PLAN_CONFIDENCE_THRESHOLD = 0.8
+    # 超过该长度（字符数）的 chart_data 字符串优先走流式解析
+    _STREAM_PARSE_MIN_CHARS = 1024 * 1024
+    _PLAN_CACHE_MAX_SIZE = 256
+    _PLAN_CACHE_TTL_SECONDS = 600
+    # 折线图/双轴图降采样的默认点数预算
+    _DEFAULT_MAX_POINTS = 2000
+    # 散点图超过该行数时开启 ECharts 大数据量模式
+    _DEFAULT_SCATTER_LARGE_THRESHOLD = 5000
+    # 大模型规划的默认等待时间（秒），0 表示不限时；设置后超时使用本地自动检测的配置
+    _DEFAULT_LLM_TIMEOUT_SECONDS = 0
+    # 提示词中字段概况的默认 token 预算
+    _DEFAULT_PROMPT_TOKEN_BUDGET = 1500
+    # 系列数据达到该长度且为纯数值时，单位换算和百分比归一化走 NumPy 向量化计算
+    _VECTORIZE_MIN_ITEMS = 64
+    # 输出预算：超出时依次紧凑输出、降低小数精度、折叠类别、降采样
+    _DEFAULT_OUTPUT_MAX_BYTES = 5 * 1024 * 1024
+    _DEFAULT_OUTPUT_MAX_POINTS = 200000
+    # 饼图、环形图、漏斗图最多展示的类别数（含“其他”）
+    _DEFAULT_MAX_CATEGORIES = 50
+    # 进程内共享的大模型配置参数缓存，命中/未命中等累计计数随每条埋点记录输出（plan_cache 字段）
+    _plan_cache = PlanCache(max_size=_PLAN_CACHE_MAX_SIZE, ttl=_PLAN_CACHE_TTL_SECONDS)
 
     def _parse_chart_data_text(self, chart_data_text: str) -> Any:
         candidates = []
@@ -63,6 +101,15 @@ class Json2chartTool(Tool):
                     continue
         raise ValueError("图表数据不是有效的 JSON 格式")
 
+    def _parse_chart_data_stream(self, chart_data_text: str) -> ColumnarTable | None:
+        # 单次扫描输入，逐条修复、解析并直接按列构建；无法流式处理时返回 None，由调用方走整体解析
+        if detect_stream_mode(chart_data_text) is None:
+            return None
+        try:
+            return ColumnarTable.from_records(iter_array_items(chart_data_text))
+        except ValueError:
+            return None
+
     def _parse_numeric_value(self, value: Any) -> float | None:
         if isinstance(value, bool):
             return None
@@ -98,12 +145,10 @@ class Json2chartTool(Tool):
             return round(numeric_value / factor, 6)
         return value
 
-    def _auto_detect_keys_with_numeric_string(self, data_list: list[dict[str, Any]]) -> tuple[str, list[str]]:
-        if not data_list:
+    def _auto_detect_keys_with_numeric_string(self, table: ColumnarTable) -> tuple[str, list[str]]:
+        if not table:
             raise ValueError("数据列表不能为空")
-        sample = data_list[0]
-        if not isinstance(sample, dict):
-            raise ValueError("数据项格式不正确，期望为对象列表")
+        sample = table.row(0)
 
         name_candidates = []
         value_candidates = []
@@ -118,20 +163,19 @@ class Json2chartTool(Tool):
         if not value_candidates:
             raise ValueError("数据中不包含可转换为数值的字段，无法确定值字段")
 
-        common_name_keys = ["name", "名称", "类别", "category", "label", "项目", "月份", "日期", "时间"]
-        name_key = next((k for k in common_name_keys if k in name_candidates), name_candidates[0])
+        name_key = next((k for k in self._COMMON_NAME_KEYS if k in name_candidates), name_candidates[0])
         return name_key, value_candidates
 
     def _convert_single_row_wide_table(
         self,
-        data_list: list[dict[str, Any]],
+        table: ColumnarTable,
         value_keys: list[str] | None = None,
         series_names: list[str] | None = None,
-    ) -> tuple[list[dict[str, Any]], bool]:
-        if len(data_list) != 1 or not isinstance(data_list[0], dict):
-            return data_list, False
+    ) -> tuple[ColumnarTable, bool]:
+        if len(table) != 1:
+            return table, False
 
-        row = data_list[0]
+        row = table.row(0)
         candidate_keys = value_keys or [k for k, v in row.items() if self._is_numeric_like(v)]
         transposed_data = []
         for i, key in enumerate(candidate_keys):
@@ -144,18 +188,55 @@ class Json2chartTool(Tool):
             transposed_data.append({"category": category_name, "value": numeric_value})
 
         if not transposed_data:
-            return data_list, False
-        return transposed_data, True
+            return table, False
+        return ColumnarTable.from_records(transposed_data), True
 
-    def _should_convert_single_row_wide_table(self, chart_type: str | None, data_list: list[dict[str, Any]], value_keys: list[str] | None) -> bool:
+    def _should_convert_single_row_wide_table(self, chart_type: str | None, table: ColumnarTable, value_keys: list[str] | None) -> bool:
+        spec = get_spec(chart_type)
         return (
-            chart_type in self._SINGLE_ROW_WIDE_TABLE_CHART_TYPES
-            and len(data_list) == 1
+            spec is not None
+            and spec.wide_table
+            and len(table) == 1
             and len(value_keys or []) > 1
         )
 
+    def _numeric_series_array(self, data: list) -> tuple[np.ndarray, list[int]] | None:
+        """
+        纯数值（int/float，允许 None）的系列数据转为 float64 数组，同时返回 None 所在的下标；
+        包含字典、列表、文本、布尔等取值或数据较短时返回 None，由调用方逐项处理。
+        """
+        if len(data) < self._VECTORIZE_MIN_ITEMS:
+            return None
+        value_types = set(map(type, data))
+        if not value_types <= {int, float, type(None)}:
+            return None
+        if type(None) not in value_types:
+            return np.array(data, dtype=np.float64), []
+        null_indices = [i for i, value in enumerate(data) if value is None]
+        return np.array([np.nan if value is None else value for value in data], dtype=np.float64), null_indices
+
+    def _round_values(self, values: np.ndarray, null_indices: list[int]) -> list:
+        """
+        向量化的 round(value, 6)，结果与内置 round 逐个计算完全一致：
+        小数部分离 .5 足够远时 rint(x * 1e6) / 1e6 与内置 round 的取舍相同，
+        乘法误差可能改变取舍方向的取值（接近 .5、数值过大或非有限值）改用内置 round。
+        """
+        scaled = values * 1e6
+        result = (np.rint(scaled) / 1e6).tolist()
+        with np.errstate(invalid="ignore"):
+            safe = (np.abs(scaled) < 2.0 ** 40) & (np.abs(scaled - np.floor(scaled) - 0.5) > 1e-3)
+        for i in np.flatnonzero(~safe).tolist():
+            result[i] = round(float(values[i]), 6)
+        for i in null_indices:
+            result[i] = None
+        return result
+
     def _scale_series_data(self, data: Any, factor: float) -> Any:
         if isinstance(data, list):
+            numeric = self._numeric_series_array(data)
+            if numeric is not None:
+                values, null_indices = numeric
+                return self._round_values(values / factor, null_indices)
             scaled = []
             for item in data:
                 if isinstance(item, dict):
@@ -205,6 +286,11 @@ class Json2chartTool(Tool):
 
     def _normalize_percent_series_data(self, data: Any) -> Any:
         if isinstance(data, list):
+            numeric = self._numeric_series_array(data)
+            if numeric is not None:
+                # 0~1 之间的小数视为比例，换算为百分数
+                values, null_indices = numeric
+                return self._round_values(np.where((values >= 0) & (values <= 1), values * 100, values), null_indices)
             normalized = []
             for item in data:
                 if isinstance(item, dict):
@@ -230,28 +316,45 @@ class Json2chartTool(Tool):
     def _add_unit_to_formatter(self, formatter: Any, value_unit: str) -> Any:
         if not isinstance(formatter, str) or not value_unit:
             return formatter
-        updated = formatter
-        for token in self._FORMATTER_TOKENS:
-            updated = updated.replace(token, f"{token}{value_unit}")
-        return updated
+        return add_unit_to_formatter(formatter, value_unit)
 
     def _add_percent_to_formatter(self, formatter: Any) -> Any:
         if not isinstance(formatter, str):
             return formatter
-        updated = formatter
-        for token in self._FORMATTER_TOKENS:
-            updated = re.sub(rf"{re.escape(token)}(?!\s*%)", f"{token}%", updated)
-        return updated
+        return add_percent_to_formatter(formatter)
 
-    def _apply_value_unit(self, echarts_config: str, value_unit: str) -> str:
+    def _rewrite_label_formatters(self, series: dict[str, Any], is_percent: bool, value_unit: str) -> None:
+        # 系列标签（含高亮状态）中显示数值的 formatter 同样追加单位/百分号，label 可能与其他系列共用，复制后再修改
+        for owner in (series, series.get("emphasis")):
+            if not isinstance(owner, dict):
+                continue
+            label = owner.get("label")
+            if not isinstance(label, dict) or not isinstance(label.get("formatter"), str):
+                continue
+            if is_percent:
+                formatter = self._add_percent_to_formatter(label["formatter"])
+            else:
+                formatter = self._add_unit_to_formatter(label["formatter"], value_unit)
+            owner["label"] = {**label, "formatter": formatter}
+
+    def _apply_value_unit(self, echarts_config: dict[str, Any] | str, value_unit: str) -> dict[str, Any] | str:
+        """原地修改配置对象；传入 JSON 字符串时解析后处理，并返回序列化后的字符串"""
+        if isinstance(echarts_config, str):
+            try:
+                config = loads(echarts_config)
+            except Exception:
+                return echarts_config
+            return dumps(self._apply_value_unit(config, value_unit))
+
+        config = echarts_config
         factor = self._get_unit_factor(value_unit)
-        try:
-            config = json.loads(echarts_config)
-        except Exception:
-            return echarts_config
 
         y_axis = config.get("yAxis")
         series_list = config.get("series")
+        # dataset 模式下系列通过 encode 引用 dataset.source 中的列，换算作用在列上，同一列只处理一次
+        dataset = config.get("dataset")
+        dataset_source = dataset.get("source") if isinstance(dataset, dict) else None
+        converted_dimensions: set[str] = set()
         axis_names_by_index: dict[int, str] = {}
         if isinstance(y_axis, dict):
             axis_names_by_index[0] = y_axis.get("name", "")
@@ -285,19 +388,28 @@ class Json2chartTool(Tool):
                         series_tooltip["formatter"] = self._add_percent_to_formatter(series_tooltip.get("formatter"))
                     else:
                         series_tooltip["formatter"] = self._add_unit_to_formatter(series_tooltip.get("formatter"), value_unit)
+                self._rewrite_label_formatters(series, is_percent, value_unit)
 
                 if "data" in series:
                     if is_percent:
                         series["data"] = self._normalize_percent_series_data(series["data"])
                     else:
                         series["data"] = self._scale_series_data(series["data"], factor)
+                elif isinstance(series.get("encode"), dict) and isinstance(dataset_source, dict):
+                    encode = series["encode"]
+                    dimension = encode.get("y", encode.get("value"))
+                    if dimension in dataset_source and dimension not in converted_dimensions:
+                        converted_dimensions.add(dimension)
+                        if is_percent:
+                            dataset_source[dimension] = self._normalize_percent_series_data(dataset_source[dimension])
+                        else:
+                            dataset_source[dimension] = self._scale_series_data(dataset_source[dimension], factor)
 
         if isinstance(y_axis, dict):
             has_percent = axis_has_percent.get(0, False)
             has_amount = axis_has_amount.get(0, False)
-            axis_label = y_axis.get("axisLabel", {})
-            if not isinstance(axis_label, dict):
-                axis_label = {}
+            # 复制一份再修改，避免改动到共享的主题样式
+            axis_label = dict(y_axis["axisLabel"]) if isinstance(y_axis.get("axisLabel"), dict) else {}
             if has_percent and not has_amount:
                 y_axis["name"] = "%"
                 axis_label["formatter"] = "{value}%"
@@ -314,9 +426,7 @@ class Json2chartTool(Tool):
                 has_percent = axis_has_percent.get(i, False)
                 has_amount = axis_has_amount.get(i, False)
                 axis_name = axis.get("name", "")
-                axis_label = axis.get("axisLabel", {})
-                if not isinstance(axis_label, dict):
-                    axis_label = {}
+                axis_label = dict(axis["axisLabel"]) if isinstance(axis.get("axisLabel"), dict) else {}
 
                 if has_percent and not has_amount:
                     axis["name"] = axis_name if self._contains_percent_hint(axis_name) else "%"
@@ -341,370 +451,764 @@ class Json2chartTool(Tool):
             elif any_amount_series and not any_percent_series:
                 tooltip["formatter"] = self._add_unit_to_formatter(tooltip.get("formatter"), value_unit)
 
-        return json.dumps(config, indent=4, ensure_ascii=False)
-    
-    def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage]:
-        chart_data = tool_parameters.get("chart_data", [])
-        chart_title = tool_parameters.get("chart_title")
-        chart_type = tool_parameters.get("chart_type")
-        data_desc = tool_parameters.get("data_desc")
-        model = tool_parameters.get("model")
-        saturation = tool_parameters.get("saturation", 0.5)
-        brightness = tool_parameters.get("brightness", 0.95)
-        value_unit = tool_parameters.get("value_unit", "万元")
-        
-        # 检查 chart_data 是否为字符串，若是则尝试解析为 JSON
-        if isinstance(chart_data, str):
-            try:
-                chart_data = self._parse_chart_data_text(chart_data)
-            except Exception as e:
-                raise ValueError("图表数据不是有效的 JSON 格式") from e
+        return config
 
+    def _build_table(self, chart_data: Any) -> ColumnarTable:
+        # 常见的对象列表/列字典结构直接单次构建列式表，其他结构仍交给 pandas 解析
         try:
-            df = pd.DataFrame(chart_data)
-            data_list = df.to_dict(orient='records')  # 将 DataFrame 转换为列表
+            return ColumnarTable.from_data(chart_data)
+        except TypeError:
+            # pandas 导入较慢，只在确实需要时才导入
+            import pandas as pd
 
-            # 提取数据样本时，优先使用去重后的数据，确保展示所有类型
-            try:
-                unique_df = df.drop_duplicates()
-            except TypeError:
-                # 如果包含不可哈希的类型（如列表），则跳过去重
-                unique_df = df
-            
-            sample_df = unique_df.head(20)
-            # 转换为类似 Markdown 格式，设置 index=False 避免输出索引列
-            sample_data = sample_df.to_csv(sep='|', na_rep='nan', index=False)
-            sample_markdown = '|' + sample_data.replace('\n', '\n|')
+            return ColumnarTable.from_dataframe(pd.DataFrame(chart_data))
+
+    def _invoke_llm(
+        self,
+        model: dict[str, Any],
+        system_prompt: str,
+        user_prompt: str,
+        timeout: float | None = None,
+        hedge_after: float | None = None,
+        metadata: dict[str, Any] | None = None,
+        openers: str = "{",
+    ) -> str:
+        """
+        流式调用大模型，返回第一个完整的 JSON 对象（openers 含 "[" 时也接受数组）文本，拿到后立即关闭流，不再等待后续的说明文字；
+        流结束仍未得到完整 JSON 时，返回清洗掉 markdown 代码块标记后的全部文本。
+        超过 timeout 秒未返回时抛出 TimeoutError；设置 hedge_after 时首次调用过慢会再发起一次对冲调用。
+        超时或对冲落败的调用在收到下一个分片时停止读取并关闭流，不会一直占用后台线程。
+        """
+        def call(cancel: threading.Event):
+            chunks = self.session.model.llm.invoke(
+                model_config=LLMModelConfig(
+                    provider=model.get('provider'),
+                    model=model.get('model'),
+                    mode=model.get('mode'),
+                    completion_params=model.get('completion_params'),
+                ),
+                prompt_messages=self._build_prompt_messages(system_prompt, user_prompt),
+                stream=True
+            )
+            return self._read_plan_stream(chunks, openers=openers, cancel=cancel)
+
+        started = time.perf_counter()
+        try:
+            content, attempt = call_with_deadline(call, timeout=timeout, hedge_after=hedge_after)
+        except TimeoutError:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"调用大模型生成配置失败: {str(e)}") from e
+        finally:
+            if metadata is not None:
+                metadata["llm_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        if metadata is not None:
+            metadata["llm_hedged"] = attempt > 0
+        return content
+
+    def _build_prompt_messages(self, system_prompt: str, user_prompt: str) -> list[Any]:
+        """静态的系统提示词在前、每次请求不同的数据在后，前缀保持不变以命中服务商的自动前缀缓存"""
+        return [SystemPromptMessage(content=system_prompt), UserPromptMessage(content=user_prompt)]
+
+    def _read_plan_stream(self, chunks: Any, openers: str = "{", cancel: threading.Event | None = None) -> str:
+        # 单图配置只接受对象，避免把说明文字中的数组（如 ["销量"]）当作配置；批量模式另外允许数组
+        scanner = JsonObjectScanner(openers)
+        parts = []
+        try:
+            for chunk in chunks:
+                if cancel is not None and cancel.is_set():
+                    # 调用方已不再等待（超时或对冲落败），结果会被丢弃
+                    return ""
+                text = chunk.delta.message.content
+                if isinstance(text, list):
+                    text = "".join(getattr(item, "data", "") or "" for item in text)
+                if not text:
+                    continue
+                parts.append(text)
+                if scanner.feed(text) is not None:
+                    return scanner.text
+        finally:
+            # 提前结束时关闭流，停止接收剩余的输出
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+        if scanner.finish() is not None:
+            return scanner.text
+
+        content = "".join(parts).strip()
+        # 尝试去除 markdown 代码块标记
+        if "```" in content:
+            pattern = r"```(?:json)?\s*(.*?)\s*```"
+            match = re.search(pattern, content, re.DOTALL)
+            if match:
+                content = match.group(1)
+        return content
 
-            # 调用大模型生成配置参数
+    def _request_chart_plan(
+        self,
+        model: dict[str, Any],
+        chart_type: str | None,
+        chart_title: str | None,
+        data_desc: str | None,
+        data_profile: str,
+        llm_limits: tuple[float | None, float | None] = (None, None),
+        metadata: dict[str, Any] | None = None,
+    ) -> str:
+        timeout, hedge_after = llm_limits
+        return self._invoke_llm(
+            model,
+            CHART_PLAN_SYSTEM_PROMPT,
+            chart_plan_user_prompt(chart_type, chart_title, data_desc, data_profile),
+            timeout=timeout,
+            hedge_after=hedge_after,
+            metadata=metadata,
+        )
+
+    def _request_chart_plans(
+        self,
+        model: dict[str, Any],
+        chart_requests: list[dict[str, Any]],
+        data_desc: str | None,
+        data_profile: str,
+        llm_limits: tuple[float | None, float | None] = (None, None),
+        metadata: dict[str, Any] | None = None,
+    ) -> list[Any]:
+        """一次大模型调用为多个图表需求生成配置参数，返回与需求顺序一致的配置列表"""
+        timeout, hedge_after = llm_limits
+        content = self._invoke_llm(
+            model,
+            BATCH_PLAN_SYSTEM_PROMPT,
+            batch_plan_user_prompt(dumps(chart_requests, compact=True), data_desc, data_profile),
+            timeout=timeout,
+            hedge_after=hedge_after,
+            metadata=metadata,
+            openers="{[",
+        )
+        logger.debug("批量模式大模型输出的json (清洗后): %s", content)
+        try:
+            plans = json.loads(content)
+        except json.JSONDecodeError:
+            raise ValueError("大模型返回的内容不是有效的 JSON 格式")
+        if isinstance(plans, dict):
+            plans = plans.get("charts", [plans])
+        if not isinstance(plans, list):
+            raise ValueError("大模型返回的内容不是图表配置数组")
+        return plans
+
+    def _parse_chart_requests(self, charts: Any) -> list[dict[str, Any]]:
+        # 批量模式的图表需求：对象数组（chart_type/chart_title/data_desc 均可选），字符串项视为图表类型
+        if isinstance(charts, str):
             try:
-                response = self.session.model.llm.invoke(
-                    model_config=LLMModelConfig(
-                        provider=model.get('provider'),
-                        model=model.get('model'),
-                        mode=model.get('mode'),
-                        completion_params=model.get('completion_params'),
-                    ),
-                    prompt_messages=[
-                        SystemPromptMessage(
-                            content="""
-                            你是一个专业的数据可视化专家，需要根据给定的 Markdown 表格数据，判断合适的横坐标和纵坐标，用于生成可视化图表。请遵循以下规则：
-                            1. 输出格式必须为 JSON，包含`chart_type`, `chart_title`, `name_key`, `value_keys`, `series_names` 字段。
-                            2. `chart_type` 的值为字符串，代表图表类型，目前支持"柱状图"、"折线图"、"饼状图"、"雷达图"、"漏斗图"、"散点图"、"环形图"、"双轴图"、"堆叠柱状图"。若用户指定了图表类型，则按用户的来，若没有指定，则你根据表格样例信息自动判断。
-                            3. `chart_title` 的值为字符串，代表图表标题，若用户指定了标题，则按用户的来，若没有指定，则你根据表格样例信息自动生成。
-                            4. `name_key` 的值为一个字符串，代表横坐标的 key，必须为 Markdown 表格中已有的表头字段，且应为类别型数据。
-                            5. `value_keys` 的值为一个字符串数组，代表纵坐标的 key，这些 key 必须为 Markdown 表格中已有的表头字段，且必须为数值类型数据。
-                            6. `series_names` 的值为一个字符串数组，是 `value_keys` 对应 key 的中文翻译，与 `value_keys` 数组元素一一对应。
-                            7. `group_key` 的值为一个字符串（可选），代表用于分组的字段名。当数据需要按某个维度分组展示多系列图表时使用，如课程号、产品类别等。
-                            8. 请根据 markdown 表格数据内容，抓取对数据分析有展现价值的 key。
-                            9. 确保横纵坐标的选取有数据分析意义，避免选取序号等无分析价值的字段。
-                            10. 雷达图适合多维度对比分析，至少需要3个数值字段；散点图适合两个数值指标间的相关性分析，必须选择两个数值字段作为value_keys，name_key应选择类别型或ID型字段（不是数值字段）；漏斗图适合流程转化率分析，需要有明确的先后顺序。
-                            11. 饼图和环形图支持多个数值字段（生成同心圆），若需展示多维数据占比可选择多个value_keys；柱状图和折线图适合展示类别与数值的关系。
-                            12. 当数据中存在明显的分组维度（如多个课程、多个产品等）且需要比较它们在同一指标上的差异时，应识别出合适的`group_key`，group_key应是类别型字段。
-                            13. 对于散点图，当需要按类别区分不同数据点时，应将类别型字段设置为group_key，而不是name_key。
-                            14. 请仔细识别数据类型，确保value_keys只包含可以进行数学运算的数值字段，避免选择文本或混合类型字段。
-                            15. 对于双轴图，请额外输出 `bar_value_keys`（柱状图指标数组）和 `line_value_keys`（折线图指标数组）。
-                            16. 对于环形图，如果可以计算出总额或有明确的中心文本，请输出 `center_text` 字段。
-                            17. 只输出标准的 json 格式内容，不要包含```json```标签，不要输出其他任何文字。
-                            
-                            示例：
-                            表格数据：
-                            |产品|销量|利润|
-                            |---|---|---|
-                            |A|100|20|
-                            |B|200|50|
-                            |C|150|30|
-                            
-                            柱状图输出：
-                            {"chart_type":"柱状图","chart_title":"产品销量与利润分析","name_key":"产品","value_keys":["销量","利润"],"series_names":["销量","利润"]}
-                            
-                            饼图输出：
-                            {"chart_type":"饼状图","chart_title":"产品销量分布","name_key":"产品","value_keys":["销量"],"series_names":["销量"]}
-                            
-                            带分组的折线图输出（例如课程成绩数据）：
-                            {"chart_type":"折线图","chart_title":"各课程成绩对比","name_key":"score_month","value_keys":["score"],"series_names":["成绩"],"group_key":"course_no"}
-                            
-                            散点图输出（例如产品价格与销量关系分析）：
-                            {"chart_type":"散点图","chart_title":"产品价格与销量关系分析","name_key":"产品名称","value_keys":["价格(元)","月销量(台)"],"series_names":["价格(元)","月销量(台)"],"group_key":"品牌"}
-
-                            双轴图输出（例如税负率和同比变动率）：
-                            {"chart_type":"双轴图","chart_title":"税负率分析","name_key":"月份","value_keys":["税负率","同比变动率"],"series_names":["税负率","同比变动率"],"bar_value_keys":["税负率"],"line_value_keys":["同比变动率"]}
-                            """
-                        ),
-                        UserPromptMessage(
-                            content=f"用户指定的类型：{chart_type}\n用户指定的标题：{chart_title}\n数据补充说明：{data_desc}\n表格的样例数据:\n{sample_markdown}"
-                        )
-                    ],
-                    stream=False
-                )
+                charts = loads(charts)
             except Exception as e:
-                raise RuntimeError(f"调用大模型生成配置失败: {str(e)}") from e
+                raise ValueError("charts 不是有效的 JSON 格式") from e
+        if not isinstance(charts, list) or not charts:
+            raise ValueError("charts 必须为非空的图表需求数组")
 
-            # 提取大模型返回的 JSON 数据
-            try:
-                content = response.message.content.strip()
-                # 尝试去除 markdown 代码块标记
-                if "```" in content:
-                    pattern = r"```(?:json)?\s*(.*?)\s*```"
-                    match = re.search(pattern, content, re.DOTALL)
-                    if match:
-                        content = match.group(1)
-                
-                print("大模型输出的json (清洗后):", content)
+        chart_requests = []
+        for item in charts:
+            if isinstance(item, str):
+                item = {"chart_type": item}
+            if not isinstance(item, dict):
+                raise ValueError("charts 中的每一项必须为对象")
+            chart_requests.append({
+                "chart_type": item.get("chart_type"),
+                "chart_title": item.get("chart_title"),
+                "data_desc": item.get("data_desc"),
+            })
+        return chart_requests
+
+    def _read_render_options(self, tool_parameters: dict[str, Any]) -> dict[str, Any]:
+        downsample = tool_parameters.get("downsample")
+        if downsample == "none":
+            downsample = None
+        scatter_large_threshold = tool_parameters.get("scatter_large_threshold")
+        if scatter_large_threshold is None:
+            scatter_large_threshold = self._DEFAULT_SCATTER_LARGE_THRESHOLD
+        return {
+            "saturation": tool_parameters.get("saturation", 0.5),
+            "brightness": tool_parameters.get("brightness", 0.95),
+            "value_unit": tool_parameters.get("value_unit", "万元"),
+            "compact_json": bool(tool_parameters.get("compact_json", False)),
+            "downsample": downsample,
+            "max_points": int(tool_parameters.get("max_points") or self._DEFAULT_MAX_POINTS),
+            "scatter_large_threshold": int(scatter_large_threshold),
+            "scatter_point_names": bool(tool_parameters.get("scatter_point_names", True)),
+            "use_dataset": bool(tool_parameters.get("use_dataset", False)),
+            "parallel_workers": tool_parameters.get("parallel_workers"),
+            "output_max_bytes": self._read_limit(tool_parameters, "output_max_bytes", self._DEFAULT_OUTPUT_MAX_BYTES),
+            "output_max_points": self._read_limit(tool_parameters, "output_max_points", self._DEFAULT_OUTPUT_MAX_POINTS),
+            "max_categories": self._read_limit(tool_parameters, "max_categories", self._DEFAULT_MAX_CATEGORIES),
+        }
+
+    def _read_limit(self, tool_parameters: dict[str, Any], name: str, default: int) -> int:
+        # 未填写时使用默认值，0 表示不限制
+        value = tool_parameters.get(name)
+        return int(default if value is None else value)
+
+    def _read_local_plan_threshold(self, tool_parameters: dict[str, Any]) -> float:
+        local_plan_threshold = tool_parameters.get("local_plan_threshold")
+        if local_plan_threshold is None:
+            local_plan_threshold = self._LOCAL_PLAN_CONFIDENCE_THRESHOLD
+        return local_plan_threshold
+
+    def _read_llm_limits(self, tool_parameters: dict[str, Any]) -> tuple[float | None, float | None]:
+        # (等待超时, 对冲延迟)，0 表示不限时/不对冲
+        llm_timeout = tool_parameters.get("llm_timeout")
+        if llm_timeout is None:
+            llm_timeout = self._DEFAULT_LLM_TIMEOUT_SECONDS
+        hedge_after = tool_parameters.get("llm_hedge_after")
+        return float(llm_timeout) or None, float(hedge_after or 0) or None
+
+    def _describe_table(self, table: ColumnarTable, tool_parameters: dict[str, Any]) -> str:
+        # 提示词中的数据描述：按 token 预算渲染的字段概况，宽表也不会让提示词无限增长
+        token_budget = tool_parameters.get("prompt_token_budget") or self._DEFAULT_PROMPT_TOKEN_BUDGET
+        return render_profile(table, token_budget=int(token_budget))
+
+    def _fallback_plan(self, chart_type: str | None, chart_title: str | None) -> dict[str, Any]:
+        # 大模型超时时使用的占位配置：字段留空，由 _render_chart 的回退逻辑通过 _auto_detect_keys_with_numeric_string 确定字段
+        return {
+            "chart_type": chart_type if get_spec(chart_type) is not None else None,
+            "chart_title": chart_title,
+            "name_key": None,
+            "value_keys": [],
+            "series_names": [],
+        }
+
+    def _load_table(self, chart_data: Any, metrics: Any = NULL_METRICS) -> ColumnarTable:
+        # 检查 chart_data 是否为字符串，若是则尝试解析为 JSON
+        if isinstance(chart_data, str):
+            if metrics.enabled:
+                metrics.set(input_bytes=len(chart_data.encode("utf-8")))
+            with metrics.stage("parse"):
+                streamed_table = None
+                if len(chart_data) >= self._STREAM_PARSE_MIN_CHARS:
+                    streamed_table = self._parse_chart_data_stream(chart_data)
+                if streamed_table is not None:
+                    chart_data = streamed_table
+                else:
+                    try:
+                        chart_data = self._parse_chart_data_text(chart_data)
+                    except Exception as e:
+                        raise ValueError("图表数据不是有效的 JSON 格式") from e
+
+        # 只构建一次列式中间表示，后续校验、数值转换、转置和图表生成都直接使用它
+        with metrics.stage("table"):
+            table = self._build_table(chart_data)
+        metrics.set(rows=len(table), cols=len(table.columns))
+        return table
+
+    def _lookup_plan(
+        self,
+        table: ColumnarTable,
+        model: dict[str, Any],
+        chart_type: str | None,
+        chart_title: str | None,
+        data_desc: str | None,
+        local_plan_threshold: float,
+    ) -> tuple[dict[str, Any] | None, str, str | None]:
+        """
+        不调用大模型的规划：先查缓存，再尝试本地规则（填写了 data_desc 时不使用本地规则）。
+        :return: (config_params, 缓存键, 配置来源 cache/local_rules)，都未命中时 config_params 和来源为 None
+        """
+        # 相同数据结构 + 相同用户参数 + 相同模型时直接复用缓存的配置参数，跳过大模型调用
+        cache_key = build_plan_cache_key(
+            columns=table.column_names,
+            dtypes=table.dtypes,
+            chart_type=chart_type,
+            chart_title=chart_title,
+            data_desc=data_desc,
+            model=model,
+            prompt_version=PROMPT_VERSION,
+        )
+        config_params = self._plan_cache.get(cache_key)
+        if config_params is not None:
+            return config_params, cache_key, "cache"
+        # 本地规则无法理解数据补充说明（如“只展示成本”），填写了说明时交给大模型规划
+        has_data_desc = isinstance(data_desc, str) and bool(data_desc.strip())
+        if chart_type in chart_types() and not has_data_desc:
+            # 用户指定了图表类型且数据结构明确时，直接用本地规则生成配置参数
+            local_params, confidence = plan_chart_locally(
+                table,
+                chart_type,
+                chart_title=chart_title,
+                name_hints=self._COMMON_NAME_KEYS,
+                percent_hints=self._PERCENT_HINTS,
+            )
+            if local_params is not None and confidence >= local_plan_threshold:
+                return local_params, cache_key, "local_rules"
+        return None, cache_key, None
+
+    def _render_chart(
+        self,
+        table: ColumnarTable,
+        options: dict[str, Any],
+        chart_type: str | None,
+        chart_title: str | None,
+        config_params: dict[str, Any] | None = None,
+        content: str | None = None,
+        plan_from_llm: bool = False,
+        cache_key: str | None = None,
+        metadata: dict[str, Any] | None = None,
+        metrics: Any = NULL_METRICS,
+    ) -> str:
+        """
+        根据配置参数（或大模型返回的原始文本 content）校验字段、必要时回退自动检测，生成图表并返回 echarts 代码块。
+        table 会被就地做数值转换，多个图表共用同一份数据时请传入 table.copy()。
+        metadata 不为空时记录生成过程（如是否回退到自动检测、最终的图表类型），metrics 记录各阶段耗时。
+        """
+        saturation = options["saturation"]
+        brightness = options["brightness"]
+        value_unit = options["value_unit"]
+        compact_json = options["compact_json"]
+        downsample = options["downsample"]
+        max_points = options["max_points"]
+        scatter_large_threshold = options["scatter_large_threshold"]
+        scatter_point_names = options["scatter_point_names"]
+        use_dataset = options["use_dataset"]
+
+        # 提取大模型返回的 JSON 数据
+        try:
+            if config_params is None:
+                logger.debug("大模型输出的json (清洗后): %s", content)
                 config_params = json.loads(content)
-                required_fields = ["chart_type", "chart_title", "name_key", "value_keys", "series_names"]
-                for field in required_fields:
-                    if field not in config_params:
-                        raise ValueError(f"大模型返回的 JSON 缺少必要字段: {field}")
-
-                chart_type = config_params["chart_type"]
-                chart_title = config_params["chart_title"]
-                name_key = config_params["name_key"]
-                value_keys = config_params["value_keys"]
-                series_names = config_params["series_names"]
-                # group_key是可选的
-                group_key = config_params.get("group_key")
-                # 新增图表类型的可选参数
-                bar_value_keys = config_params.get("bar_value_keys", [])
-                line_value_keys = config_params.get("line_value_keys", [])
-                center_text = config_params.get("center_text")
-
-                # 针对双轴图的特殊处理：确保 value_keys 包含 bar_value_keys 和 line_value_keys
-                if chart_type == "双轴图":
-                    # 如果 bar_value_keys 或 line_value_keys 不存在，尝试从 value_keys 中拆分
-                    if not bar_value_keys and not line_value_keys:
-                        if len(value_keys) >= 2:
-                            bar_value_keys = [value_keys[0]]
-                            line_value_keys = value_keys[1:]
-                        else:
-                            bar_value_keys = value_keys
-                            line_value_keys = []
-                    
-                    # 重新构建 value_keys 和 series_names，确保后续的数值转换逻辑能覆盖到
-                    # 注意：这里会覆盖大模型返回的 value_keys，以 bar_value_keys + line_value_keys 为准
-                    all_keys = []
-                    all_names = []
-                    
-                    for key in bar_value_keys:
-                        if key not in all_keys:
-                            all_keys.append(key)
-                            # 尝试找对应的 series_name，如果没有则用 key
-                            if key in value_keys:
-                                index = value_keys.index(key)
-                                if index < len(series_names):
-                                    all_names.append(series_names[index])
-                                else:
-                                    all_names.append(key)
+                plan_from_llm = True
+            required_fields = ["chart_type", "chart_title", "name_key", "value_keys", "series_names"]
+            for field in required_fields:
+                if field not in config_params:
+                    raise ValueError(f"大模型返回的 JSON 缺少必要字段: {field}")
+
+            chart_type = config_params["chart_type"]
+            chart_title = config_params["chart_title"]
+            name_key = config_params["name_key"]
+            value_keys = config_params["value_keys"]
+            series_names = config_params["series_names"]
+            # group_key是可选的
+            group_key = config_params.get("group_key")
+            # 新增图表类型的可选参数
+            bar_value_keys = config_params.get("bar_value_keys", [])
+            line_value_keys = config_params.get("line_value_keys", [])
+            center_text = config_params.get("center_text")
+
+            # 针对双轴图的特殊处理：确保 value_keys 包含 bar_value_keys 和 line_value_keys
+            if chart_type == "双轴图":
+                # 如果 bar_value_keys 或 line_value_keys 不存在，尝试从 value_keys 中拆分
+                if not bar_value_keys and not line_value_keys:
+                    if len(value_keys) >= 2:
+                        bar_value_keys = [value_keys[0]]
+                        line_value_keys = value_keys[1:]
+                    else:
+                        bar_value_keys = value_keys
+                        line_value_keys = []
+                
+                # 重新构建 value_keys 和 series_names，确保后续的数值转换逻辑能覆盖到
+                # 注意：这里会覆盖大模型返回的 value_keys，以 bar_value_keys + line_value_keys 为准
+                all_keys = []
+                all_names = []
+                
+                for key in bar_value_keys:
+                    if key not in all_keys:
+                        all_keys.append(key)
+                        # 尝试找对应的 series_name，如果没有则用 key
+                        if key in value_keys:
+                            index = value_keys.index(key)
+                            if index < len(series_names):
+                                all_names.append(series_names[index])
                             else:
                                 all_names.append(key)
-                                
-                    for key in line_value_keys:
-                        if key not in all_keys:
-                            all_keys.append(key)
-                            # 尝试找对应的 series_name
-                            if key in value_keys:
-                                index = value_keys.index(key)
-                                if index < len(series_names):
-                                    all_names.append(series_names[index])
-                                else:
-                                    all_names.append(key)
+                        else:
+                            all_names.append(key)
+                            
+                for key in line_value_keys:
+                    if key not in all_keys:
+                        all_keys.append(key)
+                        # 尝试找对应的 series_name
+                        if key in value_keys:
+                            index = value_keys.index(key)
+                            if index < len(series_names):
+                                all_names.append(series_names[index])
                             else:
                                 all_names.append(key)
-                    
-                    value_keys = all_keys
-                    series_names = all_names
+                        else:
+                            all_names.append(key)
+                
+                value_keys = all_keys
+                series_names = all_names
 
-                if len(value_keys) != len(series_names):
-                    raise ValueError("value_keys 和 series_names 的长度不一致")
+            if len(value_keys) != len(series_names):
+                raise ValueError("value_keys 和 series_names 的长度不一致")
 
-                if name_key not in df.columns:
-                    raise ValueError(f"name_key {name_key} 不存在于 DataFrame 中")
+            if name_key not in table:
+                raise ValueError(f"name_key {name_key} 不存在于数据中")
 
-                for value_key in value_keys:
-                    if value_key not in df.columns:
-                        raise ValueError(f"value_key {value_key} 不存在于 DataFrame 中")
+            for value_key in value_keys:
+                if value_key not in table:
+                    raise ValueError(f"value_key {value_key} 不存在于数据中")
 
-            except json.JSONDecodeError:
-                raise ValueError("大模型返回的内容不是有效的 JSON 格式")
-            except Exception:
-                # 当大模型配置无效时，尝试使用auto_detect_keys作为后备方案
-                try:
-                    recovered_with_llm_alias = False
-                    if isinstance(value_keys, list) and value_keys:
-                        converted_data, converted = self._convert_single_row_wide_table(
-                            data_list,
-                            value_keys=value_keys,
-                            series_names=series_names if isinstance(series_names, list) else None,
-                        )
-                        if converted:
-                            data_list = converted_data
-                            name_key = "category"
-                            value_keys = ["value"]
-                            series_names = ["数值"]
-                            group_key = None
-                            df = pd.DataFrame(data_list)
-                            recovered_with_llm_alias = True
-
-                    if recovered_with_llm_alias:
-                        if chart_type is None:
-                            chart_type = "柱状图"
-                        if chart_title is None:
-                            chart_title = f"{name_key} 数据分析图表"
-                    else:
-                    # 单行宽表优先转为 category/value，避免名称字段缺失导致回退失败
-                        data_list, wide_table_converted = self._convert_single_row_wide_table(data_list)
-                        # 自动检测合适的字段
-                        detected_name_key, detected_value_keys = self._auto_detect_keys_with_numeric_string(data_list)
-                        
-                        # 根据检测到的字段自动选择图表类型
-                        if chart_type is None:
-                            if wide_table_converted:
-                                chart_type = "柱状图"
-                            elif len(detected_value_keys) >= 3:
-                                chart_type = "雷达图"
-                            elif len(detected_value_keys) == 2:
-                                chart_type = "散点图"
-                            else:
-                                chart_type = "柱状图"
-                        
-                        # 设置默认的series_names
-                        detected_series_names = detected_value_keys
-
-                        # 使用检测到的字段继续处理
-                        name_key = detected_name_key
-                        value_keys = detected_value_keys
-                        series_names = detected_series_names
-                        group_key = None  # 自动检测模式下暂不支持group_key
-                        df = pd.DataFrame(data_list)
-                        
-                        # 重新设置图表标题（如果未指定）
-                        if chart_title is None:
-                            chart_title = f"{name_key} 数据分析图表"
-                except Exception as fallback_error:
-                    raise ValueError(f"自动检测字段也失败: {str(fallback_error)}") from fallback_error
-
-            # 根据图表类型验证配置参数
+            if group_key and group_key not in table:
+                raise ValueError(f"group_key {group_key} 不存在于数据中")
+
+            # 字段全部通过校验后才缓存；回退到自动检测的配置不缓存，下次仍会请求大模型
+            if plan_from_llm:
+                self._plan_cache.set(cache_key, config_params)
+
+        except json.JSONDecodeError:
+            raise ValueError("大模型返回的内容不是有效的 JSON 格式")
+        except Exception:
+            # 当大模型配置无效时，尝试使用auto_detect_keys作为后备方案
+            if metadata is not None:
+                metadata["auto_detected"] = True
             try:
-                # 验证数据类型是否适合所选图表
-                if chart_type == "散点图":
-                    # 检查name_key是否是数值字段且value_keys只有一个元素
-                    if len(value_keys) == 1 and name_key in df.columns:
-                        try:
-                            # 尝试将name_key转换为数值类型，检查是否为有效数值
-                            df[name_key] = pd.to_numeric(df[name_key], errors='coerce')
-                            if not df[name_key].isna().all():
-                                # 如果name_key是数值字段，将其也加入value_keys
-                                value_keys = [name_key] + value_keys
-                                series_names = [name_key] + series_names
-                        except:
-                            pass
-                    
-                    # 如果最终还是少于两个数值字段，使用scatter.py中的自动补充逻辑
-                    if len(value_keys) < 1:
-                        raise ValueError("散点图需要至少一个数值字段")
-                elif chart_type == "雷达图" and len(value_keys) < 3:
-                    raise ValueError("雷达图需要至少三个数值字段进行多维度分析")
-
-                # 特殊处理：双轴图且为单行宽表数据自动转置
-                if chart_type == "双轴图" and len(data_list) == 1 and bar_value_keys and line_value_keys:
-                    if len(bar_value_keys) == len(line_value_keys):
-                        transposed = []
-                        # series_names length should match the number of pairs
-                        # but in the prompt we ask LLM to output series_names corresponding to value_keys
-                        # For dual axis, value_keys usually has length = len(bar) + len(line)
-                        # or LLM just outputs series_names for the categories. We will try our best:
-                        cat_names = series_names[:len(bar_value_keys)] if len(series_names) >= len(bar_value_keys) else bar_value_keys
-                        for i in range(len(bar_value_keys)):
-                            b_key = bar_value_keys[i]
-                            l_key = line_value_keys[i]
-                            if b_key in data_list[0] and l_key in data_list[0]:
-                                b_val = self._parse_numeric_value(data_list[0].get(b_key))
-                                l_val = self._parse_numeric_value(data_list[0].get(l_key))
-                                if b_val is not None and l_val is not None:
-                                    transposed.append({
-                                        "category": cat_names[i],
-                                        "bar_value": b_val,
-                                        "line_value": l_val
-                                    })
-                        if transposed:
-                            # Try to infer metric names
-                            b_name = "柱状指标"
-                            l_name = "折线指标"
-                            if "amt" in bar_value_keys[0].lower() or "额" in bar_value_keys[0]:
-                                b_name = "金额"
-                            if "rate" in line_value_keys[0].lower() or "率" in line_value_keys[0]:
-                                l_name = "比率"
-                            
-                            data_list = transposed
-                            name_key = "category"
-                            bar_value_keys = ["bar_value"]
-                            line_value_keys = ["line_value"]
-                            value_keys = ["bar_value", "line_value"]
-                            series_names = [b_name, l_name]
-                            df = pd.DataFrame(data_list)
-
-                # 特殊处理：单行宽表数据自动转置
-                # 当饼图/环形图只有一行数据，但有多个数值列时，很可能是宽表结构（列名即类别）
-                # 此时应该转置数据，将列名作为name_key，列值作为value_key
-                if self._should_convert_single_row_wide_table(chart_type, data_list, value_keys):
-                    transposed_data, converted = self._convert_single_row_wide_table(
-                        data_list,
+                recovered_with_llm_alias = False
+                if isinstance(value_keys, list) and value_keys:
+                    converted_table, converted = self._convert_single_row_wide_table(
+                        table,
                         value_keys=value_keys,
-                        series_names=series_names,
+                        series_names=series_names if isinstance(series_names, list) else None,
                     )
-                    
                     if converted:
-                        # 更新上下文变量
-                        data_list = transposed_data
+                        table = converted_table
                         name_key = "category"
                         value_keys = ["value"]
                         series_names = ["数值"]
-                        # 更新 df，确保后续验证逻辑能找到新的字段
-                        df = pd.DataFrame(data_list)
+                        group_key = None
+                        recovered_with_llm_alias = True
 
-                # 验证字段是否为数值类型
-                for value_key in value_keys:
-                    try:
-                        # 尝试将数据转换为数值类型，验证是否为有效数值
-                        df[value_key] = pd.to_numeric(df[value_key], errors='coerce')
-                        # 检查是否有值被转换为NaN
-                        if df[value_key].isna().all():
-                            raise ValueError(f"字段 {value_key} 无法转换为数值类型")
-                    except Exception as e:
-                        raise ValueError(f"字段 {value_key} 不是有效的数值类型: {str(e)}")
+                if recovered_with_llm_alias:
+                    if chart_type is None:
+                        chart_type = "柱状图"
+                    if chart_title is None:
+                        chart_title = f"{name_key} 数据分析图表"
+                else:
+                # 单行宽表优先转为 category/value，避免名称字段缺失导致回退失败
+                    table, wide_table_converted = self._convert_single_row_wide_table(table)
+                    # 自动检测合适的字段
+                    detected_name_key, detected_value_keys = self._auto_detect_keys_with_numeric_string(table)
+                    
+                    # 根据检测到的字段自动选择图表类型
+                    if chart_type is None:
+                        if wide_table_converted:
+                            chart_type = "柱状图"
+                        elif len(detected_value_keys) >= 3:
+                            chart_type = "雷达图"
+                        elif len(detected_value_keys) == 2:
+                            chart_type = "散点图"
+                        else:
+                            chart_type = "柱状图"
+                    
+                    # 设置默认的series_names
+                    detected_series_names = detected_value_keys
 
-                data_list = df.to_dict(orient='records')
-                
-                # 根据图表类型生成 ECharts 配置
-                if chart_type not in self._SUPPORTED_CHART_TYPES:
-                    raise ValueError(f"不支持的图表类型: {chart_type}")
-
-                if chart_type == "饼状图":
-                    echarts_config = generate_echarts_pie(data_list, name_key=name_key, title=chart_title, value_keys=value_keys, series_names=series_names, saturation=saturation, brightness=brightness)
-                elif chart_type == "环形图":
-                    echarts_config = generate_echarts_donut(data_list, name_key=name_key, title=chart_title, value_keys=value_keys, center_text=center_text, saturation=saturation, brightness=brightness)
-                elif chart_type == "柱状图":
-                    echarts_config = generate_echarts_bar(data_list, name_key=name_key, title=chart_title, value_keys=value_keys, series_names=series_names, saturation=saturation, brightness=brightness, group_key=group_key)
-                elif chart_type == "堆叠柱状图":
-                    echarts_config = generate_echarts_stacked_bar(data_list, name_key=name_key, title=chart_title, value_keys=value_keys, series_names=series_names, saturation=saturation, brightness=brightness)
-                elif chart_type == "折线图":
-                    echarts_config = generate_echarts_line(data_list, name_key=name_key, title=chart_title, value_keys=value_keys, series_names=series_names, saturation=saturation, brightness=brightness, group_key=group_key)
-                elif chart_type == "双轴图":
-                    bar_names = series_names[:len(bar_value_keys)] if len(series_names) >= len(bar_value_keys) else bar_value_keys
-                    line_names = series_names[len(bar_value_keys):len(bar_value_keys)+len(line_value_keys)] if len(series_names) >= len(bar_value_keys) + len(line_value_keys) else line_value_keys
-                    # 直接调用，参数已经在前面处理好了
-                    echarts_config = generate_echarts_dual_axis(data_list, name_key=name_key, title=chart_title, bar_value_keys=bar_value_keys, line_value_keys=line_value_keys, bar_names=bar_names, line_names=line_names, saturation=saturation, brightness=brightness)
-                elif chart_type == "雷达图":
-                    echarts_config = generate_echarts_radar(data_list, name_key=name_key, title=chart_title, value_keys=value_keys, series_names=series_names, saturation=saturation, brightness=brightness, group_key=group_key)
-                elif chart_type == "漏斗图":
-                    echarts_config = generate_echarts_funnel(data_list, name_key=name_key, title=chart_title, value_keys=value_keys, series_names=series_names, saturation=saturation, brightness=brightness)
-                elif chart_type == "散点图":
-                    echarts_config = generate_echarts_scatter(data_list, name_key=name_key, title=chart_title, value_keys=value_keys, series_names=series_names, saturation=saturation, brightness=brightness, group_key=group_key)
-
-                echarts_config = self._apply_value_unit(echarts_config, value_unit)
-                yield self.create_text_message(f"\n```echarts\n{echarts_config}\n```")
-            except Exception:
-                raise
-        except Exception:
+                    # 使用检测到的字段继续处理
+                    name_key = detected_name_key
+                    value_keys = detected_value_keys
+                    series_names = detected_series_names
+                    group_key = None  # 自动检测模式下暂不支持group_key
+                    
+                    # 重新设置图表标题（如果未指定）
+                    if chart_title is None:
+                        chart_title = f"{name_key} 数据分析图表"
+            except Exception as fallback_error:
+                raise ValueError(f"自动检测字段也失败: {str(fallback_error)}") from fallback_error
+
+        # 根据图表类型验证配置参数
+        # 验证数据类型是否适合所选图表
+        if chart_type == "散点图":
+            # 检查name_key是否是数值字段且value_keys只有一个元素
+            if len(value_keys) == 1 and name_key in table:
+                try:
+                    # 尝试将name_key转换为数值类型，检查是否为有效数值
+                    if table.coerce_numeric(name_key):
+                        # 如果name_key是数值字段，将其也加入value_keys
+                        value_keys = [name_key] + value_keys
+                        series_names = [name_key] + series_names
+                except:
+                    pass
+            
+        # 数值字段个数要求由注册表中的图表声明给出（散点图不足两个时由 scatter.py 自动补充）
+        spec = get_spec(chart_type)
+        if spec is not None and len(value_keys) < spec.min_value_keys:
+            raise ValueError(spec.arity_error)
+
+        # 特殊处理：双轴图且为单行宽表数据自动转置
+        if chart_type == "双轴图" and len(table) == 1 and bar_value_keys and line_value_keys:
+            if len(bar_value_keys) == len(line_value_keys):
+                transposed = []
+                # series_names length should match the number of pairs
+                # but in the prompt we ask LLM to output series_names corresponding to value_keys
+                # For dual axis, value_keys usually has length = len(bar) + len(line)
+                # or LLM just outputs series_names for the categories. We will try our best:
+                cat_names = series_names[:len(bar_value_keys)] if len(series_names) >= len(bar_value_keys) else bar_value_keys
+                row = table.row(0)
+                for i in range(len(bar_value_keys)):
+                    b_key = bar_value_keys[i]
+                    l_key = line_value_keys[i]
+                    if b_key in row and l_key in row:
+                        b_val = self._parse_numeric_value(row.get(b_key))
+                        l_val = self._parse_numeric_value(row.get(l_key))
+                        if b_val is not None and l_val is not None:
+                            transposed.append({
+                                "category": cat_names[i],
+                                "bar_value": b_val,
+                                "line_value": l_val
+                            })
+                if transposed:
+                    # Try to infer metric names
+                    b_name = "柱状指标"
+                    l_name = "折线指标"
+                    if "amt" in bar_value_keys[0].lower() or "额" in bar_value_keys[0]:
+                        b_name = "金额"
+                    if "rate" in line_value_keys[0].lower() or "率" in line_value_keys[0]:
+                        l_name = "比率"
+                    
+                    table = ColumnarTable.from_records(transposed)
+                    name_key = "category"
+                    bar_value_keys = ["bar_value"]
+                    line_value_keys = ["line_value"]
+                    value_keys = ["bar_value", "line_value"]
+                    series_names = [b_name, l_name]
+
+        # 特殊处理：单行宽表数据自动转置
+        # 当饼图/环形图只有一行数据，但有多个数值列时，很可能是宽表结构（列名即类别）
+        # 此时应该转置数据，将列名作为name_key，列值作为value_key
+        if self._should_convert_single_row_wide_table(chart_type, table, value_keys):
+            transposed_table, converted = self._convert_single_row_wide_table(
+                table,
+                value_keys=value_keys,
+                series_names=series_names,
+            )
+            
+            if converted:
+                # 更新上下文变量
+                table = transposed_table
+                name_key = "category"
+                value_keys = ["value"]
+                series_names = ["数值"]
+
+        # 验证字段是否为数值类型
+        for value_key in value_keys:
+            try:
+                # 尝试将数据转换为数值类型，验证是否为有效数值
+                # 检查是否所有值都无法转换
+                if not table.coerce_numeric(value_key):
+                    raise ValueError(f"字段 {value_key} 无法转换为数值类型")
+            except Exception as e:
+                raise ValueError(f"字段 {value_key} 不是有效的数值类型: {str(e)}")
+
+        # 根据图表类型生成 ECharts 配置
+        if spec is None:
+            raise ValueError(f"不支持的图表类型: {chart_type}")
+
+        if chart_type == "双轴图":
+            bar_names = series_names[:len(bar_value_keys)] if len(series_names) >= len(bar_value_keys) else bar_value_keys
+            line_names = series_names[len(bar_value_keys):len(bar_value_keys)+len(line_value_keys)] if len(series_names) >= len(bar_value_keys) + len(line_value_keys) else line_value_keys
+        else:
+            bar_names = line_names = []
+        if metadata is not None:
+            metadata["chart_type"] = chart_type
+        # 按注册表查找生成函数，只传入该图表声明需要的参数
+        with metrics.stage("build"):
+            chart_config = spec.build(
+                table,
+                name_key=name_key,
+                title=chart_title,
+                saturation=saturation,
+                brightness=brightness,
+                value_keys=value_keys,
+                series_names=series_names,
+                group_key=group_key,
+                center_text=center_text,
+                bar_value_keys=bar_value_keys,
+                line_value_keys=line_value_keys,
+                bar_names=bar_names,
+                line_names=line_names,
+                downsample=downsample,
+                max_points=max_points,
+                use_dataset=use_dataset,
+                large_threshold=int(scatter_large_threshold),
+                keep_names=scatter_point_names,
+                max_categories=options["max_categories"],
+            )
+
+        # 单位换算和百分比归一化直接作用于配置对象，最后只序列化一次
+        with metrics.stage("unit"):
+            self._apply_value_unit(chart_config, value_unit)
+        with metrics.stage("serialize"):
+            echarts_config, reductions, over_budget = fit_output_budget(
+                chart_config,
+                compact=compact_json,
+                max_bytes=options["output_max_bytes"],
+                max_points=options["output_max_points"],
+            )
+        if metadata is not None and reductions:
+            # 超出输出预算时实际执行的缩减步骤，按执行顺序排列
+            metadata["reductions"] = reductions
+        if metadata is not None and over_budget:
+            metadata["over_budget"] = True
+        return f"\n```echarts\n{echarts_config}\n```"
+
+    def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage]:
+        # 每次调用一条埋点记录，未配置输出端时为空实现
+        metrics = start_request()
+        profile: dict[str, Any] = {}
+        try:
+            charts = tool_parameters.get("charts")
+            mode = "batch" if charts else "single"
+            metrics.set(mode=mode)
+            # 开启慢请求剖析时只剖析消息的生成过程，先收集全部消息再输出；两种模式本来也是生成完毕后才输出
+            with profile_request(f"{mode} {tool_parameters.get('chart_type') or ''}".strip()) as profile:
+                if charts:
+                    messages = list(self._invoke_batch(tool_parameters, self._parse_chart_requests(charts), metrics))
+                else:
+                    messages = list(self._invoke_single(tool_parameters, metrics))
+            yield from messages
+        except Exception as e:
+            metrics.set(error=str(e))
             raise
+        finally:
+            if profile.get("path"):
+                metrics.set(profile_path=profile["path"])
+            if metrics.enabled:
+                metrics.set(plan_cache=self._plan_cache.stats())
+            metrics.emit()
+
+    def _invoke_single(self, tool_parameters: dict[str, Any], metrics: Any = NULL_METRICS) -> Generator[ToolInvokeMessage]:
+        chart_title = tool_parameters.get("chart_title")
+        chart_type = tool_parameters.get("chart_type")
+        data_desc = tool_parameters.get("data_desc")
+        model = tool_parameters.get("model")
+        options = self._read_render_options(tool_parameters)
+        local_plan_threshold = self._read_local_plan_threshold(tool_parameters)
+        llm_limits = self._read_llm_limits(tool_parameters)
 
+        table = self._load_table(tool_parameters.get("chart_data", []), metrics)
+        with metrics.stage("lookup"):
+            config_params, cache_key, plan_source = self._lookup_plan(table, model, chart_type, chart_title, data_desc, local_plan_threshold)
+        # 输出的元数据：plan_source 为配置来源 cache/local_rules/llm/timeout_fallback
+        metadata: dict[str, Any] = {"plan_source": plan_source}
+        content = None
+        if config_params is None:
+            with metrics.stage("profile"):
+                data_profile = self._describe_table(table, tool_parameters)
+            try:
+                with metrics.stage("llm"):
+                    content = self._request_chart_plan(
+                        model,
+                        chart_type,
+                        chart_title,
+                        data_desc,
+                        data_profile,
+                        llm_limits=llm_limits,
+                        metadata=metadata,
+                    )
+                metadata["plan_source"] = "llm"
+            except TimeoutError:
+                # 大模型超时不再等待，使用本地自动检测的配置
+                config_params = self._fallback_plan(chart_type, chart_title)
+                metadata["plan_source"] = "timeout_fallback"
+
+        echarts_text = self._render_chart(
+            table, options, chart_type, chart_title, config_params=config_params, content=content, cache_key=cache_key, metadata=metadata, metrics=metrics
+        )
+        metrics.set(**metadata)
+        if metrics.enabled:
+            metrics.set(output_bytes=len(echarts_text.encode("utf-8")))
+        yield self.create_text_message(echarts_text)
+        yield self.create_json_message(metadata)
+
+    def _invoke_batch(
+        self, tool_parameters: dict[str, Any], chart_requests: list[dict[str, Any]], metrics: Any = NULL_METRICS
+    ) -> Generator[ToolInvokeMessage]:
+        """
+        批量模式：数据只解析、采样一次，缓存和本地规则都未命中的图表合并为一次大模型调用，
+        每个图表输出一条消息；单个图表失败时输出失败原因，不影响其他图表。
+        """
+        data_desc = tool_parameters.get("data_desc")
+        model = tool_parameters.get("model")
+        options = self._read_render_options(tool_parameters)
+        local_plan_threshold = self._read_local_plan_threshold(tool_parameters)
+        llm_limits = self._read_llm_limits(tool_parameters)
+
+        table = self._load_table(tool_parameters.get("chart_data", []), metrics)
+
+        # 每项为 [config_params, 缓存键, 是否来自大模型]，chart_metadata 为各图表输出的元数据
+        plans = []
+        chart_metadata = []
+        pending = []
+        for index, request in enumerate(chart_requests):
+            with metrics.stage("lookup"):
+                config_params, cache_key, plan_source = self._lookup_plan(
+                    table,
+                    model,
+                    request["chart_type"],
+                    request["chart_title"],
+                    request["data_desc"] or data_desc,
+                    local_plan_threshold,
+                )
+            plans.append([config_params, cache_key, False])
+            chart_metadata.append({"plan_source": plan_source})
+            if config_params is None:
+                pending.append(index)
+
+        llm_metadata: dict[str, Any] = {}
+        if pending:
+            with metrics.stage("profile"):
+                data_profile = self._describe_table(table, tool_parameters)
+            try:
+                with metrics.stage("llm"):
+                    llm_plans = self._request_chart_plans(
+                        model,
+                        [chart_requests[i] for i in pending],
+                        data_desc,
+                        data_profile,
+                        llm_limits=llm_limits,
+                        metadata=llm_metadata,
+                    )
+            except TimeoutError:
+                for index in pending:
+                    plans[index][0] = self._fallback_plan(chart_requests[index]["chart_type"], chart_requests[index]["chart_title"])
+                    chart_metadata[index]["plan_source"] = "timeout_fallback"
+            else:
+                for index, plan in zip(pending, llm_plans):
+                    if isinstance(plan, dict):
+                        plans[index][0] = plan
+                        plans[index][2] = True
+                        chart_metadata[index]["plan_source"] = "llm"
+
+        def render(index: int) -> str:
+            request = chart_requests[index]
+            config_params, cache_key, plan_from_llm = plans[index]
+            try:
+                if config_params is None:
+                    # 大模型漏掉了该图表：与单图模式一样，使用占位配置回退到自动检测
+                    config_params = self._fallback_plan(request["chart_type"], request["chart_title"])
+                    chart_metadata[index]["plan_source"] = "fallback"
+                return self._render_chart(
+                    table.copy(),
+                    options,
+                    request["chart_type"],
+                    request["chart_title"],
+                    config_params=config_params,
+                    plan_from_llm=plan_from_llm,
+                    cache_key=cache_key,
+                    metadata=chart_metadata[index],
+                    metrics=metrics,
+                )
+            except Exception as e:
+                chart_metadata[index]["error"] = str(e)
+                return f"\n第{index + 1}个图表生成失败: {str(e)}\n"
+
+        # 各图表互不依赖，并行生成后按需求顺序输出；parallel_workers 只作用于批量模式
+        texts = ordered_map(render, range(len(chart_requests)), workers=options["parallel_workers"])
+        metrics.set(
+            chart_types=[item.get("chart_type") for item in chart_metadata],
+            plan_sources=[item.get("plan_source") for item in chart_metadata],
+            auto_detected=any(item.get("auto_detected") for item in chart_metadata),
+            failed_charts=sum(1 for item in chart_metadata if "error" in item),
+            **llm_metadata,
+        )
+        if metrics.enabled:
+            metrics.set(output_bytes=sum(len(text.encode("utf-8")) for text in texts))
+        for text in texts:
+            yield self.create_text_message(text)
+        yield self.create_json_message({"charts": chart_metadata, **llm_metadata})
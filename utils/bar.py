@@ -1,4 +1,7 @@
 from utils.chart import get_colors, auto_detect_keys
+from utils.columnar import as_table
+from utils.dataset import dataset_from_table, axis_encode
+from utils.pivot import pivot_groups
 from utils.theme import (
     get_theme_global,
     VALUE_AXIS,
@@ -6,9 +9,9 @@ from utils.theme import (
     BAR_ITEM_STYLE,
     SPLIT_LINE_STYLE, GRID_STYLE,
 )
-import json
+from utils.serializer import dumps
 
-def generate_echarts_bar(
+def build_echarts_bar(
     data_list: list,
     name_key: str = None,
     value_keys: list = None,
@@ -16,17 +19,22 @@ def generate_echarts_bar(
     series_names: list = None,
     saturation=0.5,  # 新增饱和度参数
     brightness=0.95,  # 新增亮度参数
-    group_key=None  # 新增分组参数
-) -> str:
-    """生成通用 ECharts 柱状图配置，支持自动推断字段和多维数据，支持按字段分组"""
-    if not data_list:
+    group_key=None,  # 新增分组参数
+    use_dataset: bool = False
+) -> dict:
+    """
+    生成通用 ECharts 柱状图配置，支持自动推断字段和多维数据，支持按字段分组。
+    use_dataset 为 True 且未分组时，数据写入 dataset.source，各系列通过 encode 引用字段。
+    """
+    table = as_table(data_list)
+    if not table:
         raise ValueError("数据列表不能为空")
     
     if not name_key:
-        name_key, _ = auto_detect_keys(data_list)
+        name_key, _ = auto_detect_keys(table)
     
     if not value_keys:
-        _, value_key = auto_detect_keys(data_list)
+        _, value_key = auto_detect_keys(table)
         value_keys = [value_key]
     
     if series_names is None:
@@ -38,7 +46,7 @@ def generate_echarts_bar(
         required_fields.append(group_key)
     
     for field in required_fields:
-        if field not in data_list[0]:
+        if field not in table:
             raise KeyError(f"数据中未找到字段: '{field}'")
     
     # 构造配置（合并 hm-app-analysis 主题样式）
@@ -60,12 +68,10 @@ def generate_echarts_bar(
     
     # 按group_key分组生成多系列柱状图
     if group_key:
-        # 获取所有唯一的分组值
-        groups = list(set(item[group_key] for item in data_list))
-        groups.sort()  # 排序确保展示顺序一致
-        # 获取所有唯一的x轴值
-        x_axis_data = list(set(item[name_key] for item in data_list))
-        x_axis_data.sort()  # 排序确保展示顺序一致
+        # 一次建立 (分组, x轴值) -> 行下标 的索引，分组和x轴值均已排序
+        pivot = pivot_groups(table.values(group_key), table.values(name_key))
+        groups = pivot.groups
+        x_axis_data = pivot.x_axis_data
         
         # 为x轴配置（主题样式）
         config["xAxis"] = {
@@ -86,26 +92,16 @@ def generate_echarts_bar(
         legend_data = []
         color_index = 0
         
+        # 每个指标一次性生成所有分组对齐后的数据（一次向量化取值，开销低于并行任务的调度和序列化，串行执行），缺失的值用0表示
+        aligned = [pivot.series(table.values(value_key), fill=0) for value_key in value_keys]
+        series_by_value_key = dict(zip(value_keys, aligned))
+
         # 为每个分组-指标组合生成一个系列
-        for group in groups:
-            # 过滤出该分组的数据
-            group_data = [item for item in data_list if item[group_key] == group]
-            
+        for group_index, group in enumerate(groups):
             # 为每个value_key生成一个系列
             for i, value_key in enumerate(value_keys):
-                # 为每个x轴值准备数据，确保顺序一致
-                series_data = []
-                for x_value in x_axis_data:
-                    # 查找对应的y值，如果不存在则用0表示
-                    found = False
-                    for item in group_data:
-                        if item[name_key] == x_value:
-                            series_data.append(item[value_key])
-                            found = True
-                            break
-                    if not found:
-                        series_data.append(0)
-                
+                series_data = series_by_value_key[value_key][group_index]
+
                 # 使用series_names中的名称或默认名称
                 series_name = series_names[i] if i < len(series_names) else value_key
                 full_series_name = f"{group}-{series_name}"
@@ -134,11 +130,17 @@ def generate_echarts_bar(
             title = f"不同{group_key}的{', '.join(value_keys)}对比柱状图"
     else:
         # 原有逻辑 - 基于value_keys生成多系列
-        x_axis_data = [item[name_key] for item in data_list]
-        series_data_list = []
-        for value_key in value_keys:
-            series_data = [item[value_key] for item in data_list]
-            series_data_list.append(series_data)
+        if use_dataset:
+            # 数据只写入一次 dataset.source，x 轴和各系列通过 encode 引用字段
+            config["dataset"] = dataset_from_table(table, [name_key] + value_keys)
+            # dataset 模式下 {c} 是整行数据而不是系列取值，改用 ECharts 按 encode 生成的默认提示框
+            del config["tooltip"]["formatter"]
+        else:
+            x_axis_data = table.values(name_key)
+            series_data_list = []
+            for value_key in value_keys:
+                series_data = table.values(value_key)
+                series_data_list.append(series_data)
         
         # 自动生成标题
         if not title:
@@ -150,22 +152,22 @@ def generate_echarts_bar(
         # 为x轴配置（主题样式）
         config["xAxis"] = {
             "type": "category",
-            "data": x_axis_data,
             **CATEGORY_AXIS,
             "axisTick": {"alignWithLabel": True, **CATEGORY_AXIS.get("axisTick", {})},
             "axisLabel": CATEGORY_AXIS.get("axisLabel", {}),
         }
+        if not use_dataset:
+            config["xAxis"]["data"] = x_axis_data
         # 为y轴配置（主题样式）
         config["yAxis"] = {"type": "value", **VALUE_AXIS}
         
         # 设置图例数据
         config["legend"]["data"] = series_names
         
-        for i, series_data in enumerate(series_data_list):
+        for i, value_key in enumerate(value_keys):
             series_config = {
                 "name": series_names[i],
                 "type": "bar",
-                "data": series_data,
                 "itemStyle": {
                     **BAR_ITEM_STYLE,
                     "color": color_list[i],
@@ -174,9 +176,18 @@ def generate_echarts_bar(
                     "shadowColor": "rgba(0, 0, 0, 0.3)",
                 },
             }
+            if use_dataset:
+                series_config["encode"] = axis_encode(name_key, value_key)
+            else:
+                series_config["data"] = series_data_list[i]
             config["series"].append(series_config)
     
     # 更新标题
     config["title"]["text"] = title
     
-    return json.dumps(config, indent=4, ensure_ascii=False)
\ No newline at end of file
+    return config
+
+
+def generate_echarts_bar(*args, **kwargs) -> str:
+    """参数与 build_echarts_bar 相同，返回序列化后的 JSON 字符串"""
+    return dumps(build_echarts_bar(*args, **kwargs))
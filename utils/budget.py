@@ -0,0 +1,345 @@
+"""
+输出大小预算：图表配置序列化后超过字节预算，或数据点数超过点数预算时，按固定顺序逐步缩减：
+  compact_json     紧凑 JSON（去掉缩进和空格）
+  precision        小数保留 4 位有效数字（整数部分不截断）
+  fold_categories  类别过多时保留前 N 个，其余合并为“其他”（只处理饼图、环形图、漏斗图等无序类别；
+                   柱状图的 x 轴常是日期、月份等有序类别，合并后顺序失去意义，不折叠）
+  downsample       降采样（直角坐标系图表所有系列共用一组下标，散点图各系列分别抽样）
+每一步只在仍超出预算、且能缩减超出的那项预算时执行（前两步不减少点数，只在超出字节预算时执行）。
+散点图达到 scatter_large_threshold 开启大数据量模式（系列带 large: true）后，由 ECharts 负责渲染全部点：
+这类系列不计入点数预算，也不会因点数预算被降采样，只在超出字节预算时才抽样。
+"""
+import math
+from typing import Any
+
+import numpy as np
+
+from utils.downsample import downsample_indices, take
+from utils.fold import OTHER_COLOR, OTHER_NAME, fold_indices
+from utils.serializer import dumps
+
+REDUCTIONS = ("compact_json", "precision", "fold_categories", "downsample")
+
+_PRECISION_DIGITS = 4
+# 按比例估算目标行数时预留的余量（配置中数据以外的部分也占字节）
+_BYTES_MARGIN = 0.9
+# 折叠后至少保留的类别数（含“其他”），降采样后每个系列至少保留的点数
+_MIN_CATEGORIES = 10
+_MIN_POINTS = 3
+_VECTORIZE_MIN_ITEMS = 64
+
+
+def _series_list(config: dict[str, Any]) -> list[dict[str, Any]]:
+    series = config.get("series")
+    return [item for item in series if isinstance(item, dict)] if isinstance(series, list) else []
+
+
+def _dataset_source(config: dict[str, Any]) -> dict[str, list] | None:
+    dataset = config.get("dataset")
+    source = dataset.get("source") if isinstance(dataset, dict) else None
+    return source if isinstance(source, dict) else None
+
+
+def _dataset_rows(source: dict[str, list]) -> int:
+    return max((len(column) for column in source.values() if isinstance(column, list)), default=0)
+
+
+def _category_axis(config: dict[str, Any]) -> dict[str, Any] | None:
+    axis = config.get("xAxis")
+    return axis if isinstance(axis, dict) and axis.get("type") == "category" else None
+
+
+def _item_value(item: Any) -> Any:
+    return item.get("value") if isinstance(item, dict) else item
+
+
+def _is_large(series: dict[str, Any]) -> bool:
+    return series.get("large") is True
+
+
+def count_points(config: dict[str, Any], include_large: bool = True) -> int:
+    """
+    各系列的数据项个数之和；dataset 模式下每个引用 dataset 的系列按数据行数计。
+    include_large=False 时不计大数据量模式的系列。
+    """
+    source = _dataset_source(config)
+    rows = _dataset_rows(source) if source is not None else 0
+    total = 0
+    for series in _series_list(config):
+        if not include_large and _is_large(series):
+            continue
+        if isinstance(series.get("data"), list):
+            total += len(series["data"])
+        elif isinstance(series.get("encode"), dict):
+            total += rows
+    return total
+
+
+def _byte_size(text: str, limit: int) -> int:
+    # UTF-8 下每个字符最多 4 字节，明显未超出时不必编码
+    if len(text) * 4 <= limit:
+        return len(text)
+    return len(text.encode("utf-8"))
+
+
+def _round_float(value: float, digits: int) -> float:
+    if value == 0 or not math.isfinite(value):
+        return value
+    return round(value, max(digits - 1 - math.floor(math.log10(abs(value))), 0))
+
+
+def _round_array(values: list, digits: int) -> list | None:
+    """纯数值列表的向量化取舍，只改写浮点数；含其他类型时返回 None"""
+    if not all(value is None or type(value) in (int, float) for value in values):
+        return None
+    array = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+    magnitude = np.abs(array)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        decimals = np.where(magnitude > 0, digits - 1 - np.floor(np.log10(magnitude)), 0)
+    scale = 10.0 ** np.clip(np.nan_to_num(decimals), 0, 15)
+    rounded = (np.round(array * scale) / scale).tolist()
+    return [
+        value if type(value) is not float or not math.isfinite(value) else r
+        for value, r in zip(values, rounded)
+    ]
+
+
+def _trim_values(values: list, digits: int) -> list:
+    if len(values) >= _VECTORIZE_MIN_ITEMS:
+        rounded = _round_array(values, digits)
+        if rounded is not None:
+            return rounded
+    result = []
+    for value in values:
+        if type(value) is float:
+            value = _round_float(value, digits)
+        elif isinstance(value, list):
+            value = _trim_values(value, digits)
+        elif isinstance(value, dict) and "value" in value:
+            inner = value["value"]
+            if type(inner) is float:
+                value = {**value, "value": _round_float(inner, digits)}
+            elif isinstance(inner, list):
+                value = {**value, "value": _trim_values(inner, digits)}
+        result.append(value)
+    return result
+
+
+def trim_precision(config: dict[str, Any], digits: int = _PRECISION_DIGITS) -> bool:
+    """系列数据和 dataset 中的小数保留 digits 位有效数字"""
+    changed = False
+    for series in _series_list(config):
+        if isinstance(series.get("data"), list):
+            series["data"] = _trim_values(series["data"], digits)
+            changed = True
+    source = _dataset_source(config)
+    if source is not None:
+        for key, column in source.items():
+            if isinstance(column, list):
+                source[key] = _trim_values(column, digits)
+                changed = True
+    return changed
+
+
+def _take_folded(values: list, kept: list[int], other: Any) -> list:
+    return [values[i] for i in kept] + [other]
+
+
+def _fold_shared_lists(config: dict[str, Any], rows: int, kept: list[int]) -> None:
+    """与类别一一对应的图例和顶层颜色列表同步折叠"""
+    legend = config.get("legend")
+    if isinstance(legend, dict) and isinstance(legend.get("data"), list) and len(legend["data"]) == rows:
+        legend["data"] = _take_folded(legend["data"], kept, OTHER_NAME)
+    if isinstance(config.get("color"), list) and len(config["color"]) == rows:
+        config["color"] = _take_folded(config["color"], kept, OTHER_COLOR)
+
+
+def _fold_items(config: dict[str, Any], series_list: list[dict[str, Any]], keep: int) -> bool:
+    """饼图、环形图、漏斗图：各环的数据项按行对齐，使用同一组保留下标"""
+    rings = [series["data"] for series in series_list]
+    rows = len(rings[0])
+    if any(len(ring) != rows for ring in rings):
+        return False
+    folded = fold_indices([[_item_value(item) for item in ring] for ring in rings], keep)
+    if folded is None:
+        return False
+    kept, others = folded
+    for series, other in zip(series_list, others):
+        series["data"] = _take_folded(series["data"], kept, {"name": OTHER_NAME, "value": other})
+    _fold_shared_lists(config, rows, kept)
+    return True
+
+
+def _fold_dataset(config: dict[str, Any], source: dict[str, list], series_list: list[dict[str, Any]], keep: int) -> bool:
+    encode = series_list[0].get("encode") or {}
+    name_dim = encode.get("itemName")
+    if name_dim not in source:
+        return False
+    rows = len(source[name_dim])
+    value_dims = [key for key in source if key != name_dim]
+    if not value_dims or any(len(source[key]) != rows for key in value_dims):
+        return False
+    folded = fold_indices([source[key] for key in value_dims], keep)
+    if folded is None:
+        return False
+    kept, others = folded
+    source[name_dim] = _take_folded(source[name_dim], kept, OTHER_NAME)
+    for key, other in zip(value_dims, others):
+        source[key] = _take_folded(source[key], kept, other)
+    _fold_shared_lists(config, rows, kept)
+    return True
+
+
+def fold_categories(config: dict[str, Any], keep: int) -> bool:
+    """
+    类别数超过 keep 时保留取值最大的 keep - 1 个，其余合并为“其他”。
+    只处理饼图、环形图、漏斗图；柱状图、折线图的 x 轴可能是日期、月份等有序类别，不折叠，超出预算时降采样。
+    """
+    series_list = _series_list(config)
+    if not series_list or not all(series.get("type") in ("pie", "funnel") for series in series_list):
+        return False
+    keep = max(keep, _MIN_CATEGORIES)
+    source = _dataset_source(config)
+    if source is not None and all(isinstance(series.get("encode"), dict) for series in series_list):
+        return _fold_dataset(config, source, series_list, keep)
+    if not all(isinstance(series.get("data"), list) and series["data"] for series in series_list):
+        return False
+    if all(isinstance(item, dict) and "name" in item for item in series_list[0]["data"]):
+        return _fold_items(config, series_list, keep)
+    return False
+
+
+def _even_indices(n: int, target: int) -> np.ndarray:
+    return np.unique(np.linspace(0, n - 1, max(target, 1)).astype(np.int64))
+
+
+def _shared_indices(columns: list[list], target: int) -> np.ndarray:
+    """所有系列共用的保留下标：数值系列用 LTTB，含非数值时均匀抽取"""
+    indices = downsample_indices([[_item_value(item) for item in column] for column in columns], target)
+    return indices if indices is not None else _even_indices(len(columns[0]), target)
+
+
+def downsample_rows(config: dict[str, Any], target_rows: int) -> bool:
+    """直角坐标系图表按 x 轴类别对齐降采样到约 target_rows 行"""
+    target_rows = max(target_rows, _MIN_POINTS)
+    series_list = _series_list(config)
+    source = _dataset_source(config)
+    if source is not None and series_list and all(isinstance(series.get("encode"), dict) for series in series_list):
+        if not all("x" in series["encode"] for series in series_list):
+            return False
+        columns = [column for column in source.values() if isinstance(column, list)]
+        rows = _dataset_rows(source)
+        if rows <= target_rows or any(len(column) != rows for column in columns):
+            return False
+        value_columns = [source[series["encode"]["y"]] for series in series_list if series["encode"].get("y") in source]
+        indices = _shared_indices(value_columns or columns, target_rows)
+        for key, column in source.items():
+            source[key] = take(column, indices)
+        return True
+
+    axis = _category_axis(config)
+    if axis is None or not isinstance(axis.get("data"), list):
+        return False
+    rows = len(axis["data"])
+    if rows <= target_rows or not series_list or any(len(series.get("data") or ()) != rows for series in series_list):
+        return False
+    indices = _shared_indices([series["data"] for series in series_list], target_rows)
+    axis["data"] = take(axis["data"], indices)
+    for series in series_list:
+        series["data"] = take(series["data"], indices)
+    return True
+
+
+def downsample_points(config: dict[str, Any], target_points: int, include_large: bool = True) -> bool:
+    """
+    散点图等以 [x, y] 为数据项的图表：各系列按点数比例分配预算，分别均匀抽样。
+    include_large=False 时跳过大数据量模式的系列，target_points 只针对其余系列。
+    """
+    series_list = [
+        series for series in _series_list(config)
+        if isinstance(series.get("data"), list) and series["data"] and (include_large or not _is_large(series))
+    ]
+    if not series_list or not all(isinstance(series["data"][0], (list, tuple)) for series in series_list):
+        return False
+    total = sum(len(series["data"]) for series in series_list)
+    if total <= target_points:
+        return False
+    for series in series_list:
+        share = max(len(series["data"]) * target_points // total, _MIN_POINTS)
+        if len(series["data"]) > share:
+            series["data"] = take(series["data"], _even_indices(len(series["data"]), share))
+    return True
+
+
+def _target_ratio(size: int, points: int, max_bytes: int, max_points: int) -> float:
+    """为满足预算需要保留的数据比例"""
+    ratio = 1.0
+    if max_points and points > max_points:
+        ratio = min(ratio, max_points / points)
+    if max_bytes and size > max_bytes:
+        ratio = min(ratio, max_bytes / size * _BYTES_MARGIN)
+    return ratio
+
+
+def _row_count(config: dict[str, Any]) -> int:
+    source = _dataset_source(config)
+    if source is not None:
+        return _dataset_rows(source)
+    axis = _category_axis(config)
+    if axis is not None and isinstance(axis.get("data"), list):
+        return len(axis["data"])
+    return max((len(series["data"]) for series in _series_list(config) if isinstance(series.get("data"), list)), default=0)
+
+
+def fit_output_budget(
+    config: dict[str, Any],
+    compact: bool = False,
+    max_bytes: int = 0,
+    max_points: int = 0,
+) -> tuple[str, list[str], bool]:
+    """
+    序列化图表配置，超出预算时按 REDUCTIONS 的顺序原地缩减 config。max_bytes/max_points 为 0 表示不限制。
+    :return: (序列化结果, 实际执行的缩减步骤, 全部步骤执行后是否仍超出预算)
+    """
+    text = dumps(config, compact=compact)
+    # 大数据量模式的散点系列不计入点数预算
+    points = count_points(config, include_large=False) if max_points else 0
+    if (not max_bytes or _byte_size(text, max_bytes) <= max_bytes) and (not max_points or points <= max_points):
+        return text, [], False
+
+    reductions: list[str] = []
+
+    def over_bytes() -> bool:
+        return bool(max_bytes) and _byte_size(text, max_bytes) > max_bytes
+
+    def over_points() -> bool:
+        return bool(max_points) and points > max_points
+
+    if over_bytes() and not compact:
+        compact = True
+        text = dumps(config, compact=True)
+        reductions.append("compact_json")
+
+    if over_bytes() and trim_precision(config):
+        text = dumps(config, compact=compact)
+        reductions.append("precision")
+
+    if over_bytes() or over_points():
+        ratio = _target_ratio(_byte_size(text, max_bytes) if max_bytes else 0, points, max_bytes, max_points)
+        if fold_categories(config, int(_row_count(config) * ratio)):
+            text = dumps(config, compact=compact)
+            points = count_points(config, include_large=False) if max_points else 0
+            reductions.append("fold_categories")
+
+    if over_bytes() or over_points():
+        ratio = _target_ratio(_byte_size(text, max_bytes) if max_bytes else 0, points, max_bytes, max_points)
+        # 只超出点数预算时不动大数据量模式的系列；超出字节预算时所有系列一起抽样
+        include_large = over_bytes()
+        if downsample_rows(config, int(_row_count(config) * ratio)) or downsample_points(
+            config, int(count_points(config, include_large=include_large) * ratio), include_large=include_large
+        ):
+            text = dumps(config, compact=compact)
+            points = count_points(config, include_large=False) if max_points else 0
+            reductions.append("downsample")
+
+    return text, reductions, over_bytes() or over_points()
@@ -1,5 +1,6 @@
 import colorsys
 
+from utils.columnar import ColumnarTable
 from utils.theme import get_theme_colors
 
 
@@ -9,7 +10,7 @@ def auto_detect_keys(data_list: list) -> tuple:
         raise ValueError("数据列表不能为空")
     
     # 获取第一个数据项的键值对
-    sample = data_list[0]
+    sample = data_list.row(0) if isinstance(data_list, ColumnarTable) else data_list[0]
     
     # 候选名称字段（字符串类型）
     name_candidates = [k for k, v in sample.items() if isinstance(v, str)]
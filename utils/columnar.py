@@ -0,0 +1,231 @@
+import csv
+import io
+from typing import Any, Iterable
+
+import numpy as np
+
+# 行中缺少某个字段时的占位符
+_MISSING = object()
+# to_markdown_sample 查找不重复行时最多扫描的行数
+_SAMPLE_SCAN_ROWS = 10000
+
+
+def _is_null(value: Any) -> bool:
+    return value is None or value is _MISSING or (isinstance(value, float) and value != value)
+
+
+def _to_array(values: list) -> tuple[np.ndarray, np.ndarray]:
+    """把一列 Python 值转换为 NumPy 数组和空值掩码：纯整数列为 int64，数值列为 float64，其余为 object"""
+    null_mask = np.fromiter((_is_null(v) for v in values), dtype=bool, count=len(values))
+    has_null = bool(null_mask.any())
+    present = [v for v in values if not _is_null(v)] if has_null else values
+
+    if present and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        if not has_null and all(isinstance(v, int) for v in present):
+            try:
+                return np.array(values, dtype=np.int64), null_mask
+            except OverflowError:
+                pass
+        else:
+            array = np.array([np.nan if _is_null(v) else v for v in values], dtype=np.float64)
+            return array, null_mask
+    if present and not has_null and all(isinstance(v, bool) for v in present):
+        return np.array(values, dtype=bool), null_mask
+
+    array = np.empty(len(values), dtype=object)
+    # 逐个赋值，避免 NumPy 把列表类型的单元格展开成多维数组
+    for i, v in enumerate(values):
+        array[i] = None if _is_null(v) else v
+    return array, null_mask
+
+
+def _parse_number(value: Any) -> int | float | None:
+    # 与 pd.to_numeric(errors='coerce') 保持一致：不接受千分位逗号
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)):
+        return None if value != value else value
+    if isinstance(value, str):
+        text = value.strip()
+        try:
+            return int(text)
+        except ValueError:
+            pass
+        try:
+            return float(text)
+        except ValueError:
+            return None
+    return None
+
+
+class ColumnarTable:
+    """
+    图表数据的列式中间表示：列名 -> NumPy 数组，外加每列的空值掩码。
+    输入只解析一次，之后的校验、数值转换、宽表转置和各图表生成函数都直接按列读取，不再物化逐行字典。
+    """
+
+    def __init__(self, columns: dict[Any, np.ndarray], null_masks: dict[Any, np.ndarray] | None = None):
+        self.columns = columns
+        if null_masks is None:
+            null_masks = {name: np.zeros(len(array), dtype=bool) for name, array in columns.items()}
+        self.null_masks = null_masks
+        self._length = len(next(iter(columns.values()))) if columns else 0
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict[str, Any]]) -> "ColumnarTable":
+        """单次遍历对象列表，直接按列收集取值；缺失的字段记为空值"""
+        collected: dict[Any, list] = {}
+        row_count = 0
+        for row in records:
+            if not isinstance(row, dict):
+                raise ValueError("数据项格式不正确，期望为对象列表")
+            for key, value in row.items():
+                column = collected.get(key)
+                if column is None:
+                    column = collected[key] = [_MISSING] * row_count
+                column.append(value)
+            row_count += 1
+            if len(row) != len(collected):
+                for column in collected.values():
+                    if len(column) < row_count:
+                        column.append(_MISSING)
+        return cls.from_columns(collected)
+
+    @classmethod
+    def from_columns(cls, data: dict[Any, list]) -> "ColumnarTable":
+        columns = {}
+        null_masks = {}
+        for name, values in data.items():
+            columns[name], null_masks[name] = _to_array(list(values))
+        lengths = {len(array) for array in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("各列数据长度不一致")
+        return cls(columns, null_masks)
+
+    @classmethod
+    def from_dataframe(cls, df) -> "ColumnarTable":
+        return cls.from_columns({name: df[name].tolist() for name in df.columns})
+
+    @classmethod
+    def from_data(cls, chart_data: Any) -> "ColumnarTable":
+        """支持对象列表和“列名 -> 取值列表”两种常见结构，其余结构抛出 TypeError"""
+        if isinstance(chart_data, ColumnarTable):
+            return chart_data
+        if isinstance(chart_data, list) and all(isinstance(row, dict) for row in chart_data):
+            return cls.from_records(chart_data)
+        if isinstance(chart_data, dict) and chart_data and all(isinstance(v, (list, tuple)) for v in chart_data.values()):
+            return cls.from_columns(chart_data)
+        raise TypeError("不支持的数据结构")
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __contains__(self, name: Any) -> bool:
+        return name in self.columns
+
+    @property
+    def column_names(self) -> list:
+        return list(self.columns.keys())
+
+    @property
+    def dtypes(self) -> list[str]:
+        return [str(array.dtype) for array in self.columns.values()]
+
+    def column(self, name: Any) -> np.ndarray:
+        return self.columns[name]
+
+    def null_mask(self, name: Any) -> np.ndarray:
+        return self.null_masks[name]
+
+    def values(self, name: Any, rows: Any = None) -> list:
+        """返回一列（或指定行）的 Python 取值列表，空值为 None，可直接序列化为 JSON"""
+        array = self.columns[name]
+        mask = self.null_masks[name]
+        if rows is not None:
+            array = array[rows]
+            mask = mask[rows]
+        result = array.tolist()
+        if array.dtype != object and mask.any():
+            for i in np.flatnonzero(mask).tolist():
+                result[i] = None
+        return result
+
+    def row(self, index: int) -> dict[Any, Any]:
+        return {
+            name: (None if self.null_masks[name][index] else array[index].item() if array.dtype != object else array[index])
+            for name, array in self.columns.items()
+        }
+
+    def copy(self) -> "ColumnarTable":
+        """浅拷贝：共享底层数组，coerce_numeric 等整列替换不会影响原表"""
+        return ColumnarTable(dict(self.columns), dict(self.null_masks))
+
+    def take(self, rows: Any) -> "ColumnarTable":
+        """按行下标（或布尔掩码）取子表"""
+        return ColumnarTable(
+            {name: array[rows] for name, array in self.columns.items()},
+            {name: mask[rows] for name, mask in self.null_masks.items()},
+        )
+
+    def to_records(self) -> list[dict[Any, Any]]:
+        columns = {name: self.values(name) for name in self.columns}
+        return [{name: values[i] for name, values in columns.items()} for i in range(self._length)]
+
+    def coerce_numeric(self, name: Any) -> bool:
+        """
+        等价于 pd.to_numeric(errors='coerce')：把一列转换为数值，无法转换的记为空值。
+        :return: 是否至少有一个有效数值
+        """
+        array = self.columns[name]
+        if array.dtype.kind in "iuf":
+            return not bool(self.null_masks[name].all())
+        parsed = [None if _is_null(v) else _parse_number(v) for v in array.tolist()]
+        null_mask = np.fromiter((v is None for v in parsed), dtype=bool, count=len(parsed))
+        if not null_mask.any() and all(isinstance(v, int) for v in parsed):
+            numeric = np.array(parsed, dtype=np.int64)
+        else:
+            numeric = np.array([np.nan if v is None else v for v in parsed], dtype=np.float64)
+        self.columns[name] = numeric
+        self.null_masks[name] = null_mask
+        return not bool(null_mask.all())
+
+    def to_markdown_sample(self, max_rows: int = 20) -> str:
+        """取前 max_rows 条不重复的行，输出为以 | 分隔的类 Markdown 表格"""
+        seen = set()
+        sample_rows = []
+        dedupe = True
+        # 按块读取行，找够 max_rows 条就停止，不把整张表转换为 Python 对象；
+        # 重复行很多时最多扫描 _SAMPLE_SCAN_ROWS 行，不足 max_rows 条也不再继续
+        block = max(max_rows, 1) * 4
+        limit = min(self._length, max(_SAMPLE_SCAN_ROWS, block))
+        for start in range(0, limit, block):
+            rows = slice(start, min(start + block, limit))
+            columns = [self.values(name, rows) for name in self.columns]
+            for row in zip(*columns):
+                if dedupe:
+                    try:
+                        if row in seen:
+                            continue
+                        seen.add(row)
+                    except TypeError:
+                        # 如果包含不可哈希的类型（如列表），则跳过去重
+                        dedupe = False
+                sample_rows.append(row)
+                if len(sample_rows) >= max_rows:
+                    break
+            if len(sample_rows) >= max_rows:
+                break
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter="|", lineterminator="\n")
+        writer.writerow(self.column_names)
+        for row in sample_rows:
+            writer.writerow(["nan" if v is None else v for v in row])
+        return "|" + buffer.getvalue().replace("\n", "\n|")
+
+
+def as_table(data: Any) -> ColumnarTable:
+    """生成函数的统一入口：既接受 ColumnarTable，也兼容原来的对象列表"""
+    if isinstance(data, ColumnarTable):
+        return data
+    return ColumnarTable.from_records(data or [])
@@ -0,0 +1,27 @@
+"""
+ECharts dataset 输出模式：数据按列只写入一次 dataset.source，各系列通过 encode 引用字段，
+多指标、多环图表不再在每个系列里重复一份名称和取值。
+"""
+from typing import Any
+
+from utils.columnar import ColumnarTable
+
+
+def build_dataset(columns: dict[Any, list]) -> dict[str, Any]:
+    """由“列名 -> 取值列表”生成 dataset，列名统一转为字符串，与 encode 保持一致"""
+    return {"source": {str(key): values for key, values in columns.items()}}
+
+
+def dataset_from_table(table: ColumnarTable, keys: list) -> dict[str, Any]:
+    """按列读取表中的字段生成 dataset，重复的字段只写一次"""
+    return build_dataset({key: table.values(key) for key in dict.fromkeys(keys)})
+
+
+def axis_encode(name_key: Any, value_key: Any) -> dict[str, str]:
+    """直角坐标系图表（柱状图、折线图等）的字段映射"""
+    return {"x": str(name_key), "y": str(value_key)}
+
+
+def item_encode(name_key: Any, value_key: Any) -> dict[str, str]:
+    """饼图、环形图、漏斗图的字段映射"""
+    return {"itemName": str(name_key), "value": str(value_key)}
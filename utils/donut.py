@@ -1,8 +1,11 @@
 from utils.chart import get_colors, auto_detect_keys
+from utils.columnar import as_table
+from utils.dataset import dataset_from_table, item_encode
+from utils.fold import OTHER_COLOR, fold_table
 from utils.theme import get_theme_global, PIE_ITEM_STYLE
-import json
+from utils.serializer import dumps
 
-def generate_echarts_donut(
+def build_echarts_donut(
     data_list: list,
     name_key: str = None,
     value_keys: list = None,
@@ -10,38 +13,49 @@ def generate_echarts_donut(
     center_text: str = None,
     center_subtext: str = None,
     saturation=0.5,
-    brightness=0.95
-) -> str:
+    brightness=0.95,
+    use_dataset: bool = False,
+    max_categories: int = None
+) -> dict:
     """
     生成 ECharts 环形图配置，支持中心文字和左侧图例布局。
     参考 utils/pie.py 实现，主要调整了 radius、title 和 legend。
+    use_dataset 为 True 时，名称和各环取值只写入一次 dataset.source，各环通过 encode 引用字段。
+    max_categories 不为空且行数超过该值时，合并重复名称，只保留前 max_categories - 1 个类别，其余合并为“其他”。
     """
-    if not data_list:
+    table = as_table(data_list)
+    if not table:
         raise ValueError("数据列表不能为空")
     
     if not name_key:
-        name_key, _ = auto_detect_keys(data_list)
+        name_key, _ = auto_detect_keys(table)
     
     if not value_keys:
-        _, value_key = auto_detect_keys(data_list)
+        _, value_key = auto_detect_keys(table)
         value_keys = [value_key]
     
     # 验证字段存在
-    if name_key not in data_list[0]:
+    if name_key not in table:
         raise KeyError(f"数据中未找到推断的字段: '{name_key}'")
     
     for value_key in value_keys:
-        if value_key not in data_list[0]:
+        if value_key not in table:
             raise KeyError(f"数据中未找到推断的字段: '{value_key}'")
+
+    # 类别过多时折叠尾部，各环使用同一组类别
+    table, folded = fold_table(table, name_key, value_keys, max_categories)
     
     # 自动生成标题
     if not title:
         title = f"{name_key} {', '.join(value_keys)}分布环形图"
 
-    legend_data = [item[name_key] for item in data_list]
+    name_values = table.values(name_key)
+    legend_data = list(name_values)
 
     # 使用主题色板
-    color_list = get_colors(len(data_list), saturation=saturation, brightness=brightness)
+    color_list = get_colors(len(table), saturation=saturation, brightness=brightness)
+    if folded:
+        color_list[-1] = OTHER_COLOR
 
     global_theme = get_theme_global()
     
@@ -91,6 +105,12 @@ def generate_echarts_donut(
         "series": [],
         "color": color_list,
     }
+    if use_dataset:
+        config["dataset"] = dataset_from_table(table, [name_key] + value_keys)
+        # 图例由 ECharts 从数据名称中自动收集
+        del config["legend"]["data"]
+        # dataset 模式下 {c} 是整行数据而不是本环取值，改用 ECharts 按 encode 生成的默认提示框
+        del config["tooltip"]["formatter"]
     
     # 动态计算半径
     num_series = len(value_keys)
@@ -116,11 +136,6 @@ def generate_echarts_donut(
     for i, value_key in enumerate(value_keys):
         inner_r, outer_r = radii_list[i]
         
-        echarts_data = [
-            {"value": item[value_key], "name": item[name_key]}
-            for item in data_list
-        ]
-        
         series_config = {
             "name": value_key,
             "type": "pie",
@@ -147,8 +162,19 @@ def generate_echarts_donut(
             "labelLine": {
                 "show": False
             },
-            "data": echarts_data
         }
+        if use_dataset:
+            series_config["encode"] = item_encode(name_key, value_key)
+        else:
+            series_config["data"] = [
+                {"value": value, "name": name}
+                for value, name in zip(table.values(value_key), name_values)
+            ]
         config["series"].append(series_config)
 
-    return json.dumps(config, indent=4, ensure_ascii=False)
+    return config
+
+
+def generate_echarts_donut(*args, **kwargs) -> str:
+    """参数与 build_echarts_donut 相同，返回序列化后的 JSON 字符串"""
+    return dumps(build_echarts_donut(*args, **kwargs))
@@ -0,0 +1,128 @@
+"""
+折线图/双轴图的降采样：按点数预算挑选需要保留的行下标。
+lttb    Largest-Triangle-Three-Buckets，保留视觉形状
+minmax  每个桶保留最小值和最大值，保留峰谷
+多个系列分别挑选后取并集，所有系列和 x 轴使用同一组下标，保证对齐。
+"""
+from functools import partial
+from typing import Any
+
+import numpy as np
+
+from utils.executor import ordered_map
+
+DOWNSAMPLE_METHODS = ("lttb", "minmax")
+
+
+def _to_float_array(values: list) -> np.ndarray | None:
+    try:
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+
+
+def _fill_nan(y: np.ndarray) -> np.ndarray | None:
+    """空值按相邻有效点线性插值，仅用于挑选下标；全部为空时返回 None"""
+    valid = ~np.isnan(y)
+    if valid.all():
+        return y
+    if not valid.any():
+        return None
+    positions = np.arange(len(y))
+    return np.interp(positions, positions[valid], y[valid])
+
+
+def _even_indices(n: int, threshold: int) -> np.ndarray:
+    return np.unique(np.linspace(0, n - 1, threshold).astype(np.int64))
+
+
+def lttb_indices(y: np.ndarray, threshold: int) -> np.ndarray:
+    """对等间距的 y 序列执行 LTTB，返回保留点的下标（含首尾）"""
+    n = len(y)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        return _even_indices(n, threshold)
+    filled = _fill_nan(y)
+    if filled is None:
+        return _even_indices(n, threshold)
+
+    every = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    a = 0
+    for i in range(threshold - 2):
+        # 下一个桶的平均点
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        avg_x = (avg_start + avg_end - 1) / 2
+        avg_y = filled[avg_start:avg_end].mean()
+
+        # 当前桶中与上一个选中点、下一个桶平均点组成的三角形面积最大的点
+        range_start = int(i * every) + 1
+        range_end = int((i + 1) * every) + 1
+        xs = np.arange(range_start, range_end)
+        ys = filled[range_start:range_end]
+        area = np.abs((a - avg_x) * (ys - filled[a]) - (a - xs) * (avg_y - filled[a]))
+        a = range_start + int(area.argmax())
+        selected[i + 1] = a
+    selected[-1] = n - 1
+    return selected
+
+
+def minmax_indices(y: np.ndarray, threshold: int) -> np.ndarray:
+    """把序列均分为 threshold // 2 个桶，每个桶保留最小值和最大值所在的下标（含首尾）"""
+    n = len(y)
+    if threshold >= n:
+        return np.arange(n)
+    filled = _fill_nan(y)
+    if filled is None or threshold < 4:
+        return _even_indices(n, max(threshold, 1))
+
+    bucket_count = (threshold - 2) // 2
+    edges = np.linspace(1, n - 1, bucket_count + 1).astype(np.int64)
+    selected = [0, n - 1]
+    for start, end in zip(edges[:-1].tolist(), edges[1:].tolist()):
+        if end <= start:
+            continue
+        bucket = filled[start:end]
+        selected.append(start + int(bucket.argmin()))
+        selected.append(start + int(bucket.argmax()))
+    return np.unique(np.array(selected, dtype=np.int64))
+
+
+_SELECTORS = {
+    "lttb": lttb_indices,
+    "minmax": minmax_indices,
+}
+
+
+def downsample_indices(series_values: list[list], max_points: int, method: str = "lttb") -> np.ndarray | None:
+    """
+    为一组等长的系列挑选共同保留的下标。
+    点数预算按系列数均分，各系列挑选后取并集，结果不超过 max_points（每个系列至少保留首尾和一个中间点）。
+    :return: 排好序的下标数组；无需降采样或存在非数值系列时返回 None
+    """
+    if method not in _SELECTORS:
+        raise ValueError(f"不支持的降采样方法: {method}，可选: {', '.join(DOWNSAMPLE_METHODS)}")
+    if not series_values or not max_points:
+        return None
+    n = len(series_values[0])
+    if n <= max_points:
+        return None
+
+    arrays = [_to_float_array(values) for values in series_values]
+    if any(array is None for array in arrays):
+        return None
+
+    per_series = max(int(max_points) // len(arrays), 3)
+    # 各系列的挑选互不依赖，按当前执行器设置并行
+    selected = ordered_map(partial(_SELECTORS[method], threshold=per_series), arrays)
+    indices = selected[0]
+    for series_indices in selected[1:]:
+        indices = np.union1d(indices, series_indices)
+    return indices
+
+
+def take(values: list, indices: np.ndarray) -> list[Any]:
+    return [values[i] for i in indices.tolist()]
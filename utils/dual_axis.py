@@ -1,8 +1,11 @@
 from utils.chart import get_colors, auto_detect_keys
+from utils.columnar import as_table
+from utils.downsample import downsample_indices, take
+from utils.dataset import build_dataset, axis_encode
 from utils.theme import get_theme_global, VALUE_AXIS, CATEGORY_AXIS, GRID_STYLE
-import json
+from utils.serializer import dumps
 
-def generate_echarts_dual_axis(
+def build_echarts_dual_axis(
     data_list: list,
     name_key: str = None,
     bar_value_keys: list = None,
@@ -11,22 +14,28 @@ def generate_echarts_dual_axis(
     bar_names: list = None,
     line_names: list = None,
     saturation=0.5,
-    brightness=0.95
-) -> str:
+    brightness=0.95,
+    downsample: str = None,
+    max_points: int = None,
+    use_dataset: bool = False
+) -> dict:
     """
     生成 ECharts 双轴图配置（柱状图 + 折线图）。
     左轴对应柱状图，右轴对应折线图。
+    指定 downsample（lttb/minmax）且点数超过 max_points 时，柱状图和折线图系列按同一组下标降采样。
+    use_dataset 为 True 时，数据写入 dataset.source，各系列通过 encode 引用字段。
     """
-    if not data_list:
+    table = as_table(data_list)
+    if not table:
         raise ValueError("数据列表不能为空")
     
     if not name_key:
-        name_key, _ = auto_detect_keys(data_list)
+        name_key, _ = auto_detect_keys(table)
     
     # 如果未指定 value_keys，尝试自动推断
     if not bar_value_keys and not line_value_keys:
         # 简单处理：取前两个数值字段，第一个给bar，第二个给line
-        sample = data_list[0]
+        sample = table.row(0)
         value_candidates = [k for k, v in sample.items() if isinstance(v, (int, float)) and k != name_key]
         if len(value_candidates) >= 1:
             bar_value_keys = [value_candidates[0]]
@@ -48,11 +57,20 @@ def generate_echarts_dual_axis(
     # 验证字段
     required_fields = [name_key] + bar_value_keys + line_value_keys
     for field in required_fields:
-        if field not in data_list[0]:
+        if field not in table:
             raise KeyError(f"数据中未找到字段: '{field}'")
             
     # 准备数据
-    x_axis_data = [item[name_key] for item in data_list]
+    x_axis_data = table.values(name_key)
+    bar_data_list = [table.values(key) for key in bar_value_keys]
+    line_data_list = [table.values(key) for key in line_value_keys]
+
+    if downsample:
+        indices = downsample_indices(bar_data_list + line_data_list, max_points, downsample)
+        if indices is not None:
+            x_axis_data = take(x_axis_data, indices)
+            bar_data_list = [take(data, indices) for data in bar_data_list]
+            line_data_list = [take(data, indices) for data in line_data_list]
     
     # 颜色生成
     total_series = len(bar_value_keys) + len(line_value_keys)
@@ -108,6 +126,15 @@ def generate_echarts_dual_axis(
         "color": color_list
     }
     
+    if use_dataset:
+        # 数据只写入一次 dataset.source，x 轴和各系列通过 encode 引用字段
+        config["dataset"] = build_dataset({
+            name_key: x_axis_data,
+            **dict(zip(bar_value_keys, bar_data_list)),
+            **dict(zip(line_value_keys, line_data_list)),
+        })
+        del config["xAxis"]["data"]
+
     # 添加柱状图系列
     for i, key in enumerate(bar_value_keys):
         series_name = bar_names[i] if i < len(bar_names) else key
@@ -115,7 +142,7 @@ def generate_echarts_dual_axis(
             "name": series_name,
             "type": "bar",
             "yAxisIndex": 0, # 使用左轴
-            "data": [item[key] for item in data_list],
+            **({"encode": axis_encode(name_key, key)} if use_dataset else {"data": bar_data_list[i]}),
             "barMaxWidth": 30,
             "itemStyle": {"borderRadius": [5, 5, 0, 0]}
         })
@@ -127,11 +154,16 @@ def generate_echarts_dual_axis(
             "name": series_name,
             "type": "line",
             "yAxisIndex": 1, # 使用右轴
-            "data": [item[key] for item in data_list],
+            **({"encode": axis_encode(name_key, key)} if use_dataset else {"data": line_data_list[i]}),
             "smooth": True,
             "symbol": "circle",
             "symbolSize": 8,
             "lineStyle": {"width": 3}
         })
         
-    return json.dumps(config, indent=4, ensure_ascii=False)
+    return config
+
+
+def generate_echarts_dual_axis(*args, **kwargs) -> str:
+    """参数与 build_echarts_dual_axis 相同，返回序列化后的 JSON 字符串"""
+    return dumps(build_echarts_dual_axis(*args, **kwargs))
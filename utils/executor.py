@@ -0,0 +1,154 @@
+"""
+图表构建的并行执行层：ordered_map 在线程池中执行，结果按输入顺序返回。
+工作线程数通过 use_executor() 按调用上下文设置（未设置时读取环境变量 JSON2CHART_WORKERS，默认 1 即串行执行）。
+任务内部再次调用 ordered_map 时固定串行执行，避免嵌套创建线程池。
+不提供进程池：系列级任务（按分组取值、单系列降采样）本身只有几毫秒，序列化参数和结果的开销远大于计算，
+实测进程池比串行慢一倍以上；并行主要用于批量模式下互不依赖的图表。
+call_with_deadline 用于大模型调用等外部请求：限定等待时间，可选对冲请求。
+"""
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Callable, Iterable, Iterator
+
+_current = contextvars.ContextVar("json2chart_workers", default=None)
+
+# call_with_deadline 使用的共享后台线程池；超时后仍在运行的调用收到取消通知前只占用这里的线程，不阻塞调用方
+_BACKGROUND_WORKERS = 16
+_background_pool: ThreadPoolExecutor | None = None
+_background_lock = threading.Lock()
+# 正在后台线程中执行的调用数（含已超时、仍卡在第一个分片之前无法中断的调用）
+_background_running = 0
+
+
+def _normalize(workers: Any) -> int:
+    try:
+        return max(int(workers or 1), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def current_executor() -> int:
+    """返回当前上下文的工作线程数"""
+    workers = _current.get()
+    if workers is None:
+        workers = _normalize(os.environ.get("JSON2CHART_WORKERS"))
+    return workers
+
+
+@contextmanager
+def use_executor(workers: int | None = None) -> Iterator[int]:
+    """在 with 块内为当前上下文设置工作线程数"""
+    token = _current.set(_normalize(workers))
+    try:
+        yield _current.get()
+    finally:
+        _current.reset(token)
+
+
+def _call_serial(func: Callable[[Any], Any], item: Any) -> Any:
+    # 在工作线程中执行的任务不再嵌套并行
+    token = _current.set(1)
+    try:
+        return func(item)
+    finally:
+        _current.reset(token)
+
+
+def ordered_map(func: Callable[[Any], Any], items: Iterable[Any], workers: int | None = None) -> list[Any]:
+    """
+    对 items 逐个执行 func，结果顺序与输入一致。
+    workers 为空时使用当前上下文的设置。
+    """
+    items = list(items)
+    workers = min(_normalize(workers or current_executor()), len(items))
+    if workers <= 1:
+        return [func(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(partial(_call_serial, func), items))
+
+
+def _get_background_pool() -> ThreadPoolExecutor:
+    global _background_pool
+    with _background_lock:
+        if _background_pool is None:
+            _background_pool = ThreadPoolExecutor(max_workers=_BACKGROUND_WORKERS, thread_name_prefix="json2chart-call")
+        return _background_pool
+
+
+def _run_counted(func: Callable[[threading.Event], Any], cancel: threading.Event) -> Any:
+    global _background_running
+    with _background_lock:
+        _background_running += 1
+    try:
+        return func(cancel)
+    finally:
+        with _background_lock:
+            _background_running -= 1
+
+
+def call_with_deadline(
+    func: Callable[[threading.Event], Any],
+    timeout: float | None = None,
+    hedge_after: float | None = None,
+) -> tuple[Any, int]:
+    """
+    在后台线程执行 func(cancel)，最多等待 timeout 秒（为空时不限时），超时抛出 TimeoutError。
+    hedge_after 秒后第一次调用仍未返回时，再发起一次相同的对冲调用，取先成功返回的结果。
+    每次调用各有一个 cancel 事件：超时、对冲落败或调用方不再等待时置位，func 应在耗时步骤之间检查并尽快返回，
+    以释放后台线程；未开始执行的调用直接取消。阻塞在 func 内部（如等待第一个分片）的调用无法中断，
+    会一直占用后台线程直到返回，因此后台线程已有一半以上被占用时不再发起对冲调用。
+    timeout 和 hedge_after 都为空时直接在当前线程执行，不经过后台线程池。
+    :return: (结果, 产生结果的调用序号，0 为首次调用、1 为对冲调用)
+    """
+    if not timeout and not hedge_after:
+        return func(threading.Event()), 0
+
+    pool = _get_background_pool()
+    deadline = None if not timeout else time.monotonic() + timeout
+    hedge_at = None
+    if hedge_after and (deadline is None or hedge_after < timeout):
+        hedge_at = time.monotonic() + hedge_after
+
+    cancels: list[threading.Event] = []
+
+    def submit() -> Future:
+        cancel = threading.Event()
+        cancels.append(cancel)
+        return pool.submit(contextvars.copy_context().run, _run_counted, func, cancel)
+
+    futures: list[Future] = [submit()]
+    pending = set(futures)
+    first_error: BaseException | None = None
+    try:
+        while pending:
+            now = time.monotonic()
+            wake_at = min((t for t in (deadline, hedge_at) if t is not None), default=None)
+            done, pending = wait(pending, timeout=None if wake_at is None else max(wake_at - now, 0), return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=futures.index):
+                if future.exception() is None:
+                    return future.result(), futures.index(future)
+                if first_error is None:
+                    first_error = future.exception()
+
+            now = time.monotonic()
+            if hedge_at is not None and (now >= hedge_at or (not pending and first_error is not None)):
+                # 首次调用迟迟未返回（或已经失败）时发起对冲调用，只对冲一次；后台线程紧张时放弃对冲
+                hedge_at = None
+                if _background_running * 2 < _BACKGROUND_WORKERS:
+                    hedged = submit()
+                    futures.append(hedged)
+                    pending.add(hedged)
+            elif deadline is not None and now >= deadline:
+                raise TimeoutError(f"调用超过 {timeout} 秒未返回")
+        raise first_error
+    finally:
+        # 无论成功、超时还是失败，仍在运行的调用都已无人等待，通知其停止
+        for future, cancel in zip(futures, cancels):
+            cancel.set()
+            future.cancel()
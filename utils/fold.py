@@ -0,0 +1,122 @@
+"""
+类别折叠：类别过多时只保留取值最大的前 N 个，其余合并为一个“其他”类别。
+fold_table 在生成饼图、环形图、漏斗图之前作用于数据表；fold_indices 供输出预算在图表配置上折叠。
+多个取值列（如多环饼图的各环、柱状图的各系列）使用同一组保留下标，合并后仍然一一对齐。
+"""
+from typing import Any
+
+import numpy as np
+
+from utils.columnar import ColumnarTable
+
+OTHER_NAME = "其他"
+# “其他”使用固定的灰色，与各类别的主题色区分
+OTHER_COLOR = "#BFBFBF"
+
+
+def _to_float_matrix(columns: list[list]) -> np.ndarray | None:
+    """各列转为 (列数, 行数) 的浮点矩阵，空值为 nan；存在非数值时返回 None"""
+    try:
+        return np.array([[np.nan if v is None else v for v in column] for column in columns], dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+
+
+def top_n_indices(weights: np.ndarray, n: int) -> np.ndarray:
+    """权重最大的 n 个下标，按原顺序返回；只做部分排序（argpartition），不对全部类别排序"""
+    if n >= len(weights):
+        return np.arange(len(weights))
+    if n <= 0:
+        return np.empty(0, dtype=np.int64)
+    return np.sort(np.argpartition(-weights, n - 1)[:n])
+
+
+def _fold_matrix(matrix: np.ndarray, keep: int, exclude: int | None = None) -> tuple[np.ndarray, list[float | None]]:
+    """
+    matrix 为 (列数, 行数)；按各列绝对值之和保留 keep - 1 行，返回保留的行下标和其余行在各列的合计。
+    exclude 行始终不保留，计入合计。
+    """
+    weights = np.nansum(np.abs(matrix), axis=0)
+    if exclude is not None:
+        # 权重不小于 0，-1 保证不会被选中
+        weights[exclude] = -1
+    kept = top_n_indices(weights, keep - 1)
+    folded = np.ones(matrix.shape[1], dtype=bool)
+    folded[kept] = False
+    tail = matrix[:, folded]
+    others = []
+    for row in tail:
+        valid = row[~np.isnan(row)]
+        # 合计只保留 6 位小数，避免浮点累加误差出现在输出中
+        others.append(round(float(valid.sum()), 6) if len(valid) else None)
+    return kept, others
+
+
+def fold_indices(columns: list[list], keep: int) -> tuple[list[int], list[float | None]] | None:
+    """
+    按各列绝对值之和挑选保留的行：前 keep - 1 行原样保留，其余行合并为一行“其他”（共 keep 行）。
+    :return: (保留的行下标（原顺序）, “其他”行在各列的合计)；无需折叠或存在非数值时返回 None
+    """
+    if not columns or keep < 2 or len(columns[0]) <= keep:
+        return None
+    matrix = _to_float_matrix(columns)
+    if matrix is None:
+        return None
+    kept, others = _fold_matrix(matrix, keep)
+    return kept.tolist(), others
+
+
+def _factorize(values: list) -> tuple[np.ndarray, list] | None:
+    """按首次出现的顺序为取值编号；存在不可哈希的取值时返回 None"""
+    codes = np.empty(len(values), dtype=np.int64)
+    uniques: dict[Any, int] = {}
+    try:
+        for i, value in enumerate(values):
+            codes[i] = uniques.setdefault(value, len(uniques))
+    except TypeError:
+        return None
+    return codes, list(uniques)
+
+
+def _output_values(values: np.ndarray, as_int: bool) -> list:
+    """合计结果转为可序列化的取值：nan 为 None，整数列保持整数，小数保留 6 位"""
+    if as_int:
+        return [None if np.isnan(v) else int(v) for v in values.tolist()]
+    return [None if np.isnan(v) else round(v, 6) for v in values.tolist()]
+
+
+def fold_table(table: ColumnarTable, name_key: Any, value_keys: list, max_categories: int | None) -> tuple[ColumnarTable, bool]:
+    """
+    饼图、环形图、漏斗图的类别折叠：行数超过 max_categories 时，先按名称合并重复类别（各取值列分别求和），
+    类别仍超过 max_categories 时按各取值列绝对值之和保留前 max_categories - 1 个（保持首次出现的顺序），
+    其余合并为末尾的“其他”。所有取值列使用同一组保留下标，多环图表各环仍按类别对齐。
+    原数据已有名为“其他”的类别时，该类别不参与挑选，其取值并入末尾的“其他”，不会出现两个同名类别。
+    :return: (只含 name_key 和 value_keys 的新表, 是否追加了“其他”)；无需处理或无法处理时原样返回 table
+    """
+    if not max_categories or max_categories < 2 or len(table) <= max_categories:
+        return table, False
+    factorized = _factorize(table.values(name_key))
+    if factorized is None:
+        return table, False
+    codes, names = factorized
+    matrix = _to_float_matrix([table.values(key) for key in value_keys])
+    if matrix is None:
+        return table, False
+
+    # 按名称分组求和，整组都是空值的类别合计仍为空值
+    valid = ~np.isnan(matrix)
+    sums = np.array([np.bincount(codes, weights=np.where(v, row, 0.0), minlength=len(names)) for row, v in zip(matrix, valid)])
+    counts = np.array([np.bincount(codes, weights=v, minlength=len(names)) for v in valid])
+    sums[counts == 0] = np.nan
+
+    as_int = [table.column(key).dtype.kind in "iu" and not table.null_mask(key).any() for key in value_keys]
+    folded = len(names) > max_categories
+    if folded:
+        exclude = names.index(OTHER_NAME) if OTHER_NAME in names else None
+        kept, others = _fold_matrix(sums, max_categories, exclude)
+        names = [names[i] for i in kept.tolist()] + [OTHER_NAME]
+        sums = np.concatenate([sums[:, kept], np.array([[np.nan if v is None else v] for v in others])], axis=1)
+    columns = {name_key: names}
+    for key, row, is_int in zip(value_keys, sums, as_int):
+        columns[key] = _output_values(row, is_int)
+    return ColumnarTable.from_columns(columns), folded
@@ -0,0 +1,26 @@
+"""
+ECharts formatter 模板的单位/百分号改写。
+所有取值占位符合并为一个预编译的正则，单次扫描完成替换；同一模板在各系列间大量重复，结果按模板缓存。
+"""
+import re
+from functools import lru_cache
+
+# 代表数值的占位符，单位/百分号追加在其后
+FORMATTER_TOKENS = ("{c}", "{c0}", "{c1}", "{c2}", "{c[0]}", "{c[1]}", "{c[2]}")
+
+_TOKEN_ALTERNATION = "|".join(re.escape(token) for token in sorted(FORMATTER_TOKENS, key=len, reverse=True))
+_TOKEN_PATTERN = re.compile(_TOKEN_ALTERNATION)
+# 后面已经跟着 % 的占位符不再追加
+_PERCENT_TOKEN_PATTERN = re.compile(rf"(?:{_TOKEN_ALTERNATION})(?!\s*%)")
+
+
+@lru_cache(maxsize=1024)
+def add_unit_to_formatter(formatter: str, value_unit: str) -> str:
+    if not value_unit:
+        return formatter
+    return _TOKEN_PATTERN.sub(lambda match: match.group(0) + value_unit, formatter)
+
+
+@lru_cache(maxsize=1024)
+def add_percent_to_formatter(formatter: str) -> str:
+    return _PERCENT_TOKEN_PATTERN.sub(r"\g<0>%", formatter)
@@ -1,25 +1,35 @@
 from utils.chart import get_colors, auto_detect_keys
+from utils.columnar import as_table
+from utils.dataset import dataset_from_table, item_encode
+from utils.fold import OTHER_COLOR, fold_table
 from utils.theme import get_theme_global, FUNNEL_ITEM_STYLE
-import json
+from utils.serializer import dumps
 
-def generate_echarts_funnel(
+def build_echarts_funnel(
     data_list: list,
     name_key: str = None,
     value_keys: list = None,
     title: str = None,
     series_names: list = None,
     saturation=0.5,  # 新增饱和度参数
-    brightness=0.95  # 新增亮度参数
-) -> str:
-    """生成通用 ECharts 漏斗图配置，支持自动推断字段和多维数据"""
-    if not data_list:
+    brightness=0.95,  # 新增亮度参数
+    use_dataset: bool = False,
+    max_categories: int = None
+) -> dict:
+    """
+    生成通用 ECharts 漏斗图配置，支持自动推断字段和多维数据。
+    use_dataset 为 True 时，数据写入 dataset.source，系列通过 encode 引用字段。
+    max_categories 不为空且行数超过该值时，合并重复名称，只保留前 max_categories - 1 个类别，其余合并为“其他”。
+    """
+    table = as_table(data_list)
+    if not table:
         raise ValueError("数据列表不能为空")
     
     if not name_key:
-        name_key, _ = auto_detect_keys(data_list)
+        name_key, _ = auto_detect_keys(table)
     
     if not value_keys:
-        _, value_key = auto_detect_keys(data_list)
+        _, value_key = auto_detect_keys(table)
         value_keys = [value_key]
     
     if series_names is None:
@@ -27,21 +37,28 @@ def generate_echarts_funnel(
     
     # 验证字段存在
     for value_key in value_keys:
-        if value_key not in data_list[0] or name_key not in data_list[0]:
+        if value_key not in table or name_key not in table:
             raise KeyError(f"数据中未找到推断的字段: '{value_key}' 或 '{name_key}'")
     
+    # 类别过多时折叠尾部（漏斗图只使用第一个数值字段），“其他”排在最后
+    table, folded = fold_table(table, name_key, value_keys[:1], max_categories)
+
     # 准备漏斗图数据，保持原始顺序
-    echarts_data = [
-        {"value": item[value_keys[0]], "name": item[name_key]}
-        for item in data_list
-    ]
+    name_values = table.values(name_key)
+    if not use_dataset:
+        echarts_data = [
+            {"value": value, "name": name}
+            for value, name in zip(table.values(value_keys[0]), name_values)
+        ]
     
     # 自动生成标题
     if not title:
         title = f"{name_key} {value_keys[0]}漏斗图"
 
     # 使用主题色板
-    color_list = get_colors(len(data_list), saturation=saturation, brightness=brightness)
+    color_list = get_colors(len(table), saturation=saturation, brightness=brightness)
+    if folded:
+        color_list[-1] = OTHER_COLOR
 
     global_theme = get_theme_global()
     config = {
@@ -56,7 +73,7 @@ def generate_echarts_funnel(
         },
         "legend": {
             **global_theme["legend"],
-            "data": [item[name_key] for item in data_list],
+            "data": list(name_values),
         },
         "series": [
             {
@@ -93,10 +110,23 @@ def generate_echarts_funnel(
                         "fontWeight": "bold"
                     }
                 },
-                "data": echarts_data
             }
         ],
         "color": color_list
     }
+    if use_dataset:
+        config["dataset"] = dataset_from_table(table, [name_key, value_keys[0]])
+        config["series"][0]["encode"] = item_encode(name_key, value_keys[0])
+        # 图例由 ECharts 从数据名称中自动收集
+        del config["legend"]["data"]
+        # dataset 模式下 {c} 是整行数据而不是系列取值，改用 ECharts 按 encode 生成的默认提示框
+        del config["tooltip"]["formatter"]
+    else:
+        config["series"][0]["data"] = echarts_data
     
-    return json.dumps(config, indent=4, ensure_ascii=False)
\ No newline at end of file
+    return config
+
+
+def generate_echarts_funnel(*args, **kwargs) -> str:
+    """参数与 build_echarts_funnel 相同，返回序列化后的 JSON 字符串"""
+    return dumps(build_echarts_funnel(*args, **kwargs))
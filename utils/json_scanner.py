@@ -0,0 +1,102 @@
+"""
+增量 JSON 扫描：逐段接收大模型的流式输出，括号配平后立即解析出第一个完整的 JSON 对象/数组。
+对象前后的 markdown 代码块标记、说明文字都会被忽略，调用方拿到结果后即可关闭流。
+"""
+import json
+from typing import Any
+
+_OPENERS = {"{": "}", "[": "]"}
+
+
+class JsonObjectScanner:
+    """
+    用法：对每个流式片段调用 feed()，返回非 None 时即得到第一个完整且合法的顶层 JSON 值。
+    openers 为可以作为顶层值开头的括号，只需要对象时传入 "{"，说明文字中的 [xxx] 不会被当作结果。
+    配平但解析失败或括号不匹配的候选（如说明文字中的 {xxx}）会被放弃，从候选起点的下一个字符重新扫描，
+    嵌套在其中的合法对象仍然能被找到。
+    """
+
+    def __init__(self, openers: str = "{["):
+        self._openers = openers
+        self._text = ""
+        # 下一个待扫描字符的位置，以及当前候选对象的起始位置
+        self._pos = 0
+        self._start = -1
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escaped = False
+        self.text = ""
+        self.value: Any = None
+
+    @property
+    def done(self) -> bool:
+        return bool(self.text)
+
+    def feed(self, chunk: str) -> Any:
+        if self.done or not chunk:
+            return self.value if self.done else None
+        self._text += chunk
+        return self._scan()
+
+    def finish(self) -> Any:
+        """
+        流结束时调用：仍有未闭合的候选（如说明文字中只有左括号的 {xxx）时，
+        放弃它并从下一个字符重新扫描，返回找到的值，找不到时返回 None。
+        """
+        while not self.done and self._start >= 0:
+            self._restart()
+            self._scan()
+        return self.value if self.done else None
+
+    def _scan(self) -> Any:
+        text = self._text
+        while self._pos < len(text):
+            i = self._pos
+            char = text[i]
+            self._pos += 1
+            if self._start < 0:
+                if char in self._openers:
+                    self._start = i
+                    self._stack = [_OPENERS[char]]
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in _OPENERS:
+                self._stack.append(_OPENERS[char])
+            elif char in "}]":
+                if char != self._stack[-1]:
+                    # 括号不匹配，放弃当前候选
+                    self._restart()
+                    continue
+                self._stack.pop()
+                if not self._stack and self._try_parse(i + 1):
+                    return self.value
+        return None
+
+    def _restart(self) -> None:
+        """放弃当前候选，从其起点的下一个字符重新扫描"""
+        self._pos = self._start + 1
+        self._start = -1
+        self._stack = []
+        self._in_string = False
+        self._escaped = False
+
+    def _try_parse(self, end: int) -> bool:
+        candidate = self._text[self._start:end]
+        try:
+            self.value = json.loads(candidate)
+        except json.JSONDecodeError:
+            self._restart()
+            return False
+        self.text = candidate
+        return True
@@ -0,0 +1,210 @@
+"""
+请求级埋点：各阶段耗时、输入/输出字节数、行列数、缓存命中、回退路径、图表类型等，
+每次调用结束时作为一条记录交给已配置的输出端（sink）。
+记录中的 plan_cache 为配置参数缓存在进程内的累计统计（hits/misses/evictions/size）。
+
+输出端通过环境变量 JSON2CHART_METRICS 配置（逗号分隔，可同时启用多个）：
+  log             写入 logging（logger 名为 json2chart.metrics）
+  jsonl:<路径>    以 JSON Lines 追加写入文件
+  registry        汇总到进程内的指标注册表，见 registry_snapshot()
+也可以调用 set_sinks()/add_sink() 注册自定义输出端（任意接受一个 dict 参数的可调用对象）。
+未配置任何输出端时 start_request() 返回空实现，埋点调用几乎没有开销。
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Iterator
+
+Sink = Callable[[dict[str, Any]], None]
+
+logger = logging.getLogger("json2chart.metrics")
+
+
+class LoggingSink:
+    def __init__(self, level: int = logging.INFO):
+        self.level = level
+
+    def __call__(self, record: dict[str, Any]) -> None:
+        logger.log(self.level, json.dumps(record, ensure_ascii=False, default=str))
+
+
+class JsonLinesSink:
+    """每条记录追加为文件中的一行 JSON，多线程写入时加锁"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+class RegistrySink:
+    """
+    进程内的指标汇总：计数器按“名称 -> 次数”累加，阶段耗时按“阶段 -> 次数/总耗时/最大耗时”汇总。
+    计数器包括请求数、各图表类型、各配置来源、回退、错误和批量模式中失败的图表数；
+    plan_cache 本身就是累计值，只保留最近一条记录中的统计。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: dict[str, int] = {}
+        self.stages: dict[str, dict[str, float]] = {}
+        self.plan_cache: dict[str, int] = {}
+
+    def _incr(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def __call__(self, record: dict[str, Any]) -> None:
+        with self._lock:
+            self._incr("requests")
+            for chart_type in record.get("chart_types") or [record.get("chart_type")]:
+                if chart_type:
+                    self._incr(f"chart_type.{chart_type}")
+            for plan_source in record.get("plan_sources") or [record.get("plan_source")]:
+                if plan_source:
+                    self._incr(f"plan_source.{plan_source}")
+            if record.get("auto_detected"):
+                self._incr("fallback.auto_detect")
+            if record.get("error"):
+                self._incr("errors")
+            if record.get("failed_charts"):
+                self._incr("failed_charts", record["failed_charts"])
+            if record.get("plan_cache"):
+                self.plan_cache = dict(record["plan_cache"])
+            for stage, seconds in (record.get("stages_ms") or {}).items():
+                stats = self.stages.setdefault(stage, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+                stats["count"] += 1
+                stats["total_ms"] += seconds
+                stats["max_ms"] = max(stats["max_ms"], seconds)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "stages": {stage: dict(stats) for stage, stats in self.stages.items()},
+                "plan_cache": dict(self.plan_cache),
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.stages.clear()
+            self.plan_cache = {}
+
+
+class RequestMetrics:
+    """一次调用的埋点数据，stage() 可以重复进入（如批量模式的多个图表），同名阶段耗时累加"""
+
+    enabled = True
+
+    def __init__(self, sinks: list[Sink]):
+        self._sinks = sinks
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self.fields: dict[str, Any] = {}
+        self.stages_ms: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.stages_ms[name] = self.stages_ms.get(name, 0.0) + elapsed
+
+    def set(self, **fields: Any) -> None:
+        with self._lock:
+            self.fields.update(fields)
+
+    def append(self, name: str, value: Any) -> None:
+        with self._lock:
+            self.fields.setdefault(name, []).append(value)
+
+    def emit(self) -> None:
+        record = {
+            **self.fields,
+            "total_ms": round((time.perf_counter() - self._started) * 1000, 3),
+            "stages_ms": {stage: round(ms, 3) for stage, ms in self.stages_ms.items()},
+        }
+        for sink in self._sinks:
+            try:
+                sink(record)
+            except Exception:
+                # 埋点输出失败不影响图表生成
+                logger.exception("指标输出失败")
+
+
+class _NullMetrics:
+    """未启用埋点时使用的空实现"""
+
+    enabled = False
+    _stage = nullcontext()
+
+    def stage(self, name: str) -> nullcontext:
+        return self._stage
+
+    def set(self, **fields: Any) -> None:
+        pass
+
+    def append(self, name: str, value: Any) -> None:
+        pass
+
+    def emit(self) -> None:
+        pass
+
+
+NULL_METRICS = _NullMetrics()
+
+_sinks: list[Sink] = []
+_registry: RegistrySink | None = None
+
+
+def _sinks_from_env(spec: str) -> list[Sink]:
+    global _registry
+    sinks: list[Sink] = []
+    for item in (part.strip() for part in spec.split(",")):
+        if not item:
+            continue
+        if item == "log":
+            sinks.append(LoggingSink())
+        elif item.startswith("jsonl:"):
+            sinks.append(JsonLinesSink(item[len("jsonl:"):]))
+        elif item == "registry":
+            _registry = _registry or RegistrySink()
+            sinks.append(_registry)
+        else:
+            raise ValueError(f"不支持的指标输出端: {item}，可选: log, jsonl:<路径>, registry")
+    return sinks
+
+
+def set_sinks(sinks: list[Sink]) -> None:
+    """替换全部输出端，传入空列表即关闭埋点"""
+    global _sinks
+    _sinks = list(sinks)
+
+
+def add_sink(sink: Sink) -> None:
+    set_sinks(_sinks + [sink])
+
+
+def registry_snapshot() -> dict[str, Any] | None:
+    """进程内注册表的当前汇总，未启用 registry 输出端时返回 None"""
+    return _registry.snapshot() if _registry is not None else None
+
+
+def start_request() -> RequestMetrics | _NullMetrics:
+    if not _sinks:
+        return NULL_METRICS
+    return RequestMetrics(_sinks)
+
+
+set_sinks(_sinks_from_env(os.environ.get("JSON2CHART_METRICS") or ""))
@@ -1,25 +1,36 @@
 from utils.chart import get_colors, auto_detect_keys
+from utils.columnar import as_table
+from utils.dataset import dataset_from_table, item_encode
+from utils.fold import OTHER_COLOR, fold_table
 from utils.theme import get_theme_global, PIE_ITEM_STYLE
-import json
+from utils.serializer import dumps
 
-def generate_echarts_pie(
+def build_echarts_pie(
     data_list: list,
     name_key: str = None,
     value_keys: list = None,
     title: str = None,
     series_names: list = None,
     saturation=0.5,  # 新增饱和度参数
-    brightness=0.95  # 新增亮度参数
-) -> str:
-    """生成通用 ECharts 饼图配置，支持自动推断字段和多维数据"""
-    if not data_list:
+    brightness=0.95,  # 新增亮度参数
+    use_dataset: bool = False,
+    max_categories: int = None
+) -> dict:
+    """
+    生成通用 ECharts 饼图配置，支持自动推断字段和多维数据。
+    use_dataset 为 True 时，名称和各环取值只写入一次 dataset.source，各环通过 encode 引用字段，
+    颜色由顶层 color 按名称顺序统一分配。
+    max_categories 不为空且行数超过该值时，合并重复名称，只保留前 max_categories - 1 个类别，其余合并为“其他”。
+    """
+    table = as_table(data_list)
+    if not table:
         raise ValueError("数据列表不能为空")
     
     if not name_key:
-        name_key, _ = auto_detect_keys(data_list)
+        name_key, _ = auto_detect_keys(table)
     
     if not value_keys:
-        _, value_key = auto_detect_keys(data_list)
+        _, value_key = auto_detect_keys(table)
         value_keys = [value_key]
     
     if series_names is None:
@@ -27,29 +38,36 @@ def generate_echarts_pie(
     
     # 验证字段存在
     for value_key in value_keys:
-        if value_key not in data_list[0] or name_key not in data_list[0]:
+        if value_key not in table or name_key not in table:
             raise KeyError(f"数据中未找到推断的字段: '{value_key}' 或 '{name_key}'")
+
+    # 类别过多时折叠尾部，各环使用同一组类别
+    table, folded = fold_table(table, name_key, value_keys, max_categories)
     
+    name_values = table.values(name_key)
     all_echarts_data = []
-    for value_key in value_keys:
-        echarts_data = [
-            {"value": item[value_key], "name": item[name_key]}
-            for item in data_list
-        ]
-        all_echarts_data.append(echarts_data)
+    if not use_dataset:
+        for value_key in value_keys:
+            echarts_data = [
+                {"value": value, "name": name}
+                for value, name in zip(table.values(value_key), name_values)
+            ]
+            all_echarts_data.append(echarts_data)
     
     # 自动生成标题
     if not title:
         title = f"{name_key} {', '.join(value_keys)}分布饼图"
 
-    legend_data = [item[name_key] for item in data_list]
+    legend_data = list(name_values)
 
     max_radius = 70  # 最大半径
     min_radius = 30   # 最小内径
-    ring_width = (max_radius - min_radius) / len(all_echarts_data) if len(all_echarts_data) > 1 else 20
+    ring_width = (max_radius - min_radius) / len(value_keys) if len(value_keys) > 1 else 20
 
     # 使用主题色板（与 hm-app-analysis 一致）
-    color_list = get_colors(len(data_list), saturation=saturation, brightness=brightness)
+    color_list = get_colors(len(table), saturation=saturation, brightness=brightness)
+    if folded:
+        color_list[-1] = OTHER_COLOR
 
     global_theme = get_theme_global()
     config = {
@@ -71,12 +89,18 @@ def generate_echarts_pie(
         "series": [],
         "color": color_list,
     }
+    if use_dataset:
+        config["dataset"] = dataset_from_table(table, [name_key] + value_keys)
+        # 图例由 ECharts 从数据名称中自动收集
+        del config["legend"]["data"]
+        # dataset 模式下 {c} 是整行数据而不是本环取值，改用 ECharts 按 encode 生成的默认提示框
+        del config["tooltip"]["formatter"]
 
     # 计算每个系列的半径，避免饼图重叠
-    series_count = len(all_echarts_data)
+    series_count = len(value_keys)
     radius_step = 20 // series_count  # 根据系列数量计算半径步长
 
-    for i, echarts_data in enumerate(all_echarts_data):
+    for i, value_key in enumerate(value_keys):
         # 外层系列用大半径，内层系列用小半径
         outer_radius = max_radius - i * ring_width
         inner_radius = max(outer_radius - ring_width, 0)
@@ -104,16 +128,23 @@ def generate_echarts_pie(
             "labelLine": {
                 "show": False
             },
-            "data": [
+        }
+        if use_dataset:
+            series_config["encode"] = item_encode(name_key, value_key)
+        else:
+            series_config["data"] = [
                 {
-                    "value": item[value_keys[i]],
-                    "name": item[name_key],
+                    **item,
                     # 保持颜色与图例一致
                     "itemStyle": {"color": color_list[j]}
                 }
-                for j, item in enumerate(data_list)
+                for j, item in enumerate(all_echarts_data[i])
             ]
-        }
         config["series"].append(series_config)
 
-    return json.dumps(config, indent=4, ensure_ascii=False)
\ No newline at end of file
+    return config
+
+
+def generate_echarts_pie(*args, **kwargs) -> str:
+    """参数与 build_echarts_pie 相同，返回序列化后的 JSON 字符串"""
+    return dumps(build_echarts_pie(*args, **kwargs))
@@ -0,0 +1,58 @@
+from typing import Any
+
+import numpy as np
+
+
+class GroupPivot:
+    """
+    按 (分组, 横坐标) 建立的行下标索引，供 group_key 图表一次性生成对齐的系列数据。
+    groups、x_axis_data 均为排序后的唯一值；同一单元格有多行时取第一行，与原来的线性查找结果一致。
+    """
+
+    def __init__(self, groups: list, x_axis_data: list, cells: np.ndarray, group_rows: list[list[int]]):
+        self.groups = groups
+        self.x_axis_data = x_axis_data
+        # cells[g, x] 为对应行下标，缺失为 -1
+        self.cells = cells
+        # 每个分组包含的全部行下标（保持原始顺序）
+        self.group_rows = group_rows
+
+    def series(self, values: list, fill: Any = None) -> list[list]:
+        """按分组返回与 x_axis_data 对齐的取值列表，缺失的单元格用 fill 填充"""
+        # 末尾追加 fill，缺失单元格的下标 -1 正好取到它，一次向量化取值得到所有分组的数据
+        lookup = np.empty(len(values) + 1, dtype=object)
+        try:
+            lookup[:-1] = values
+        except (ValueError, TypeError):
+            # 单元格本身是列表等序列时无法整体赋值，逐个取值
+            return [[values[row] if row >= 0 else fill for row in rows] for rows in self.cells.tolist()]
+        lookup[-1] = fill
+        return lookup[self.cells].tolist()
+
+
+def _factorize(values: list) -> tuple[list, list[int]]:
+    uniques = sorted(set(values))  # 排序确保展示顺序一致
+    positions = {value: i for i, value in enumerate(uniques)}
+    return uniques, [positions[value] for value in values]
+
+
+def pivot_groups(group_values: list, x_values: list | None = None) -> GroupPivot:
+    """
+    单次哈希分组：group_values 为分组字段取值，x_values 为横坐标字段取值（可省略，仅按分组切分行）。
+    """
+    groups, group_codes = _factorize(group_values)
+    group_rows: list[list[int]] = [[] for _ in groups]
+    for row, code in enumerate(group_codes):
+        group_rows[code].append(row)
+
+    if x_values is None:
+        return GroupPivot(groups, [], np.empty((len(groups), 0), dtype=np.int64), group_rows)
+
+    x_axis_data, x_codes = _factorize(x_values)
+    cells = np.full((len(groups), len(x_axis_data)), -1, dtype=np.int64)
+    if group_codes:
+        flat = np.asarray(group_codes, dtype=np.int64) * len(x_axis_data) + np.asarray(x_codes, dtype=np.int64)
+        # return_index 给出每个单元格第一次出现的行
+        cell_ids, first_rows = np.unique(flat, return_index=True)
+        cells.flat[cell_ids] = first_rows
+    return GroupPivot(groups, x_axis_data, cells, group_rows)
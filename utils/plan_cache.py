@@ -0,0 +1,89 @@
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+def build_plan_cache_key(
+    columns: list,
+    dtypes: list,
+    chart_type: str = None,
+    chart_title: str = None,
+    data_desc: str = None,
+    model: dict = None,
+    prompt_version: str = None,
+) -> str:
+    """根据数据结构（列名、列类型）、用户参数、模型标识和提示词版本生成缓存键，只与数据“形状”有关，与具体数值无关"""
+    model = model or {}
+    key_parts = {
+        "columns": [str(column) for column in columns],
+        "dtypes": [str(dtype) for dtype in dtypes],
+        "chart_type": chart_type,
+        "chart_title": chart_title,
+        "data_desc": data_desc,
+        "prompt_version": prompt_version,
+        "model": {
+            "provider": model.get("provider"),
+            "model": model.get("model"),
+            "mode": model.get("mode"),
+            "completion_params": model.get("completion_params"),
+        },
+    }
+    return json.dumps(key_parts, ensure_ascii=False, sort_keys=True, default=str)
+
+
+class PlanCache:
+    """大模型图表配置参数（config_params）的 LRU + TTL 缓存，线程安全"""
+
+    def __init__(self, max_size: int = 256, ttl: float = 600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, config_params = entry
+            if expires_at < time.monotonic():
+                # 过期即淘汰
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # 返回副本，避免调用方修改缓存内容
+        return copy.deepcopy(config_params)
+
+    def set(self, key: str, config_params: dict[str, Any]) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(config_params))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        """返回命中/未命中计数等统计信息"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+            }
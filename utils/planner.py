@@ -0,0 +1,199 @@
+import re
+from typing import Any
+
+from utils.columnar import as_table
+
+# 支持按 group_key 分组的图表类型
+GROUPABLE_CHART_TYPES = {"柱状图", "堆叠柱状图", "折线图", "散点图"}
+
+# 类似日期/时间的取值：2024-01、2024/1/5、2024年1月、1月、2024Q1、Q1 等
+_DATE_PATTERN = re.compile(
+    r"^(\d{4}\s*[-/.年]\s*\d{1,2}(\s*[-/.月]\s*\d{1,2}\s*日?)?\s*月?"
+    r"|\d{4}\s*年?"
+    r"|\d{1,2}\s*月"
+    r"|\d{4}\s*[-]?\s*[Qq]\d"
+    r"|[Qq]\d)$"
+)
+_DIGITS_PATTERN = re.compile(r"\d+")
+# 序号、编号类字段，没有数据分析价值
+_ID_HINTS = ("序号", "编号", "index", "idx", "id", "no")
+
+
+def _is_number(value: Any) -> bool:
+    # 与 pd.to_numeric 的行为保持一致：不接受千分位逗号
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float)):
+        return value == value  # 排除 NaN
+    if isinstance(value, str):
+        try:
+            float(value.strip())
+            return True
+        except ValueError:
+            return False
+    return False
+
+
+def _is_missing(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def _is_monotonic_dates(values: list) -> bool:
+    if len(values) < 2 or not all(isinstance(v, str) and _DATE_PATTERN.match(v.strip()) for v in values):
+        return False
+    keys = [tuple(int(d) for d in _DIGITS_PATTERN.findall(v)) for v in values]
+    increasing = all(a <= b for a, b in zip(keys, keys[1:]))
+    decreasing = all(a >= b for a, b in zip(keys, keys[1:]))
+    return increasing or decreasing
+
+
+def _is_id_like(column: str, values: list) -> bool:
+    lowered = str(column).strip().lower()
+    if lowered in _ID_HINTS or lowered.endswith("_id") or lowered.endswith("序号"):
+        return True
+    # 1,2,3... 这种连续整数序列也视为序号
+    if len(values) >= 3 and all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return all(b - a == 1 for a, b in zip(values, values[1:]))
+    return False
+
+
+def profile_columns(data_list: Any, name_hints: tuple = (), percent_hints: tuple = ()) -> dict[str, dict[str, Any]]:
+    """对每一列计算数值占比、基数、日期单调性、名称提示等特征"""
+    table = as_table(data_list)
+    row_count = len(table)
+    profiles = {}
+    for column in table.column_names:
+        values = table.values(column)
+        present = [v for v in values if not _is_missing(v)]
+        numeric_count = sum(1 for v in present if _is_number(v))
+        try:
+            distinct = len(set(present))
+        except TypeError:
+            # 不可哈希的取值（列表、字典）不参与规划
+            distinct = None
+        lowered = str(column).strip().lower()
+        profiles[column] = {
+            "numeric_ratio": numeric_count / len(present) if present else 0.0,
+            "null_ratio": 1 - len(present) / row_count if row_count else 1.0,
+            "distinct": distinct,
+            "unique": distinct == row_count,
+            "monotonic_dates": _is_monotonic_dates(values),
+            "name_hint": column in name_hints,
+            "percent_hint": any(hint in lowered for hint in percent_hints),
+            "id_like": _is_id_like(column, values),
+        }
+    return profiles
+
+
+def _score_name_column(profile: dict[str, Any]) -> float:
+    score = 0.0
+    if profile["monotonic_dates"]:
+        score += 0.5
+    if profile["name_hint"]:
+        score += 0.3
+    if profile["unique"]:
+        score += 0.2
+    if profile["id_like"]:
+        score -= 0.4
+    return score
+
+
+def plan_chart_locally(
+    data_list: Any,
+    chart_type: str,
+    chart_title: str = None,
+    name_hints: tuple = (),
+    percent_hints: tuple = (),
+) -> tuple[dict[str, Any] | None, float]:
+    """
+    基于规则的图表规划：按基数、日期单调性、数值占比和字段名提示为各列打分，
+    直接在本地生成与大模型输出格式一致的 config_params。
+    :return: (config_params, 置信度)，无法规划时 config_params 为 None
+    """
+    table = as_table(data_list)
+    if not table or not chart_type:
+        return None, 0.0
+
+    profiles = profile_columns(table, name_hints=name_hints, percent_hints=percent_hints)
+    if any(p["distinct"] is None for p in profiles.values()):
+        return None, 0.0
+
+    value_columns = [c for c, p in profiles.items() if p["numeric_ratio"] == 1.0 and not p["id_like"]]
+    category_columns = [c for c, p in profiles.items() if p["numeric_ratio"] < 0.5 and p["null_ratio"] == 0]
+    if not value_columns or not category_columns:
+        return None, 0.0
+
+    confidence = 1.0
+    ranked = sorted(category_columns, key=lambda c: _score_name_column(profiles[c]), reverse=True)
+    name_key = ranked[0]
+    group_key = None
+
+    if len(ranked) > 1:
+        # 两个类别字段得分接近时无法判断哪个是横坐标
+        gap = _score_name_column(profiles[ranked[0]]) - _score_name_column(profiles[ranked[1]])
+        if gap < 0.3:
+            confidence -= 0.3
+
+    if not profiles[name_key]["unique"]:
+        # 横坐标有重复值：只有存在唯一一个能和它组成唯一组合的类别字段时，才视为明确的分组数据
+        name_values = table.values(name_key)
+        pair_columns = [
+            c for c in category_columns
+            if c != name_key and len(set(zip(name_values, table.values(c)))) == len(table)
+        ]
+        if len(pair_columns) == 1 and chart_type in GROUPABLE_CHART_TYPES:
+            group_key = pair_columns[0]
+            confidence -= 0.1
+        else:
+            confidence -= 0.5
+
+    if not (profiles[name_key]["monotonic_dates"] or profiles[name_key]["name_hint"]):
+        confidence -= 0.15
+    if len(value_columns) > 4:
+        # 数值字段太多时，挑选“有展现价值”的指标交给大模型更合适
+        confidence -= 0.2
+
+    percent_columns = [c for c in value_columns if profiles[c]["percent_hint"]]
+    amount_columns = [c for c in value_columns if not profiles[c]["percent_hint"]]
+    bar_value_keys: list[str] = []
+    line_value_keys: list[str] = []
+
+    if chart_type in ("饼状图", "环形图", "漏斗图"):
+        value_keys = (amount_columns or value_columns)[:1]
+        if len(value_columns) > 1:
+            confidence -= 0.1
+    elif chart_type == "散点图":
+        if len(value_columns) < 2:
+            return None, 0.0
+        value_keys = value_columns[:2]
+        if len(value_columns) > 2:
+            confidence -= 0.2
+    elif chart_type == "雷达图":
+        if len(value_columns) < 3:
+            return None, 0.0
+        value_keys = value_columns
+    elif chart_type == "双轴图":
+        if len(value_columns) < 2:
+            return None, 0.0
+        if amount_columns and percent_columns:
+            bar_value_keys, line_value_keys = amount_columns, percent_columns
+        else:
+            bar_value_keys, line_value_keys = value_columns[:1], value_columns[1:]
+            confidence -= 0.1
+        value_keys = bar_value_keys + line_value_keys
+    else:
+        value_keys = value_columns
+
+    config_params = {
+        "chart_type": chart_type,
+        "chart_title": chart_title or f"{name_key} {', '.join(value_keys)}{chart_type}",
+        "name_key": name_key,
+        "value_keys": value_keys,
+        "series_names": list(value_keys),
+    }
+    if group_key:
+        config_params["group_key"] = group_key
+    if bar_value_keys or line_value_keys:
+        config_params["bar_value_keys"] = bar_value_keys
+        config_params["line_value_keys"] = line_value_keys
+    return config_params, max(confidence, 0.0)
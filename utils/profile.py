@@ -0,0 +1,213 @@
+"""
+字段概况：单次遍历每一列，得到类型、非空数、基数估计（HyperLogLog）、最小/最大值和几个示例值，
+并在 token 预算内渲染为提示词，代替按行数截取的样例表格，宽表也不会让提示词无限增长。
+"""
+import math
+from typing import Any
+
+import numpy as np
+
+from utils.columnar import ColumnarTable, _parse_number
+
+# 不超过该行数时直接精确计算基数
+_EXACT_DISTINCT_LIMIT = 4096
+# HyperLogLog 寄存器数为 2^_HLL_PRECISION，标准误差约 1.04 / sqrt(2^p)
+_HLL_PRECISION = 11
+_EXAMPLE_COUNT = 3
+_EXAMPLE_MAX_CHARS = 24
+_UINT64_MASK = (1 << 64) - 1
+
+
+def _mix64(hashes: np.ndarray) -> np.ndarray:
+    # splitmix64 的混合步骤，打散 Python hash()/浮点位模式中分布不均的低位
+    with np.errstate(over="ignore"):
+        z = hashes.astype(np.uint64, copy=True)
+        z ^= z >> np.uint64(30)
+        z *= np.uint64(0xBF58476D1CE4E5B9)
+        z ^= z >> np.uint64(27)
+        z *= np.uint64(0x94D049BB133111EB)
+        z ^= z >> np.uint64(31)
+    return z
+
+
+def hll_estimate(hashes: np.ndarray, precision: int = _HLL_PRECISION) -> int:
+    """对 64 位哈希值数组做 HyperLogLog 基数估计"""
+    if len(hashes) == 0:
+        return 0
+    m = 1 << precision
+    hashes = _mix64(hashes)
+    buckets = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    rest = hashes << np.uint64(precision)
+    # rank = 剩余位中第一个 1 的位置（从高位数起，从 1 开始）
+    _, exponents = np.frexp(rest.astype(np.float64))
+    ranks = np.where(rest == 0, 64 - precision + 1, np.clip(65 - exponents, 1, 64 - precision + 1)).astype(np.uint8)
+    registers = np.zeros(m, dtype=np.uint8)
+    np.maximum.at(registers, buckets, ranks)
+
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / float(np.sum(np.ldexp(1.0, -registers.astype(np.int64))))
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and zeros:
+        # 小基数时用线性计数修正
+        estimate = m * math.log(m / zeros)
+    return int(round(estimate))
+
+
+def _count_distinct(values: list | np.ndarray) -> tuple[int, bool]:
+    """返回 (基数, 是否为估计值)；数值列直接传入 numpy 数组，不转换为 Python 列表"""
+    if isinstance(values, np.ndarray):
+        if len(values) <= _EXACT_DISTINCT_LIMIT:
+            return int(np.unique(values).size), False
+        return hll_estimate(values.astype(np.float64).view(np.uint64)), True
+    if len(values) <= _EXACT_DISTINCT_LIMIT:
+        try:
+            return len(set(values)), False
+        except TypeError:
+            return len({repr(v) for v in values}), False
+    hashes = np.fromiter((_hash(v) & _UINT64_MASK for v in values), dtype=np.uint64, count=len(values))
+    return hll_estimate(hashes), True
+
+
+def _hash(value: Any) -> int:
+    try:
+        return hash(value)
+    except TypeError:
+        # 列表、字典等不可哈希的单元格按文本表示计算
+        return hash(repr(value))
+
+
+def _format_number(value: float) -> str:
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return f"{value:.6g}" if isinstance(value, float) else str(value)
+
+
+def _short(value: Any) -> str:
+    text = _format_number(value) if isinstance(value, float) else str(value)
+    if len(text) > _EXAMPLE_MAX_CHARS:
+        text = text[:_EXAMPLE_MAX_CHARS] + "…"
+    return text
+
+
+def profile_column(table: ColumnarTable, name: Any) -> dict[str, Any]:
+    """单列概况：type/non_null/distinct/distinct_estimated/min/max/examples"""
+    array = table.column(name)
+    mask = table.null_mask(name)
+    present = array[~mask] if mask.any() else array
+    profile: dict[str, Any] = {"name": name, "non_null": len(present), "min": None, "max": None}
+
+    if array.dtype.kind in "iuf":
+        profile["type"] = "整数" if array.dtype.kind in "iu" else "小数"
+        if len(present):
+            profile["min"], profile["max"] = present.min().item(), present.max().item()
+        profile["distinct"], profile["distinct_estimated"] = _count_distinct(present)
+        examples = present[:_EXAMPLE_COUNT * 4].tolist()
+    elif array.dtype == bool:
+        profile["type"] = "布尔"
+        values = present.tolist()
+        profile["distinct"], profile["distinct_estimated"] = len(set(values)), False
+        examples = values[:_EXAMPLE_COUNT * 4]
+    else:
+        values = present.tolist()
+        kinds = set()
+        low = high = None
+        for value in values:
+            if isinstance(value, str):
+                number = _parse_number(value)
+                kinds.add("text" if number is None else "numeric_text")
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                number = value
+                kinds.add("number")
+            else:
+                number = None
+                kinds.add("other")
+            if number is not None:
+                if low is None or number < low:
+                    low = number
+                if high is None or number > high:
+                    high = number
+        if not kinds:
+            profile["type"] = "空"
+        elif kinds <= {"number", "numeric_text"}:
+            profile["type"] = "数值型文本" if "numeric_text" in kinds else "数值"
+            profile["min"], profile["max"] = low, high
+        elif kinds == {"text"}:
+            profile["type"] = "文本"
+        else:
+            profile["type"] = "混合"
+        profile["distinct"], profile["distinct_estimated"] = _count_distinct(values)
+        examples = values[:_EXAMPLE_COUNT * 4]
+
+    # 示例取前几个不同的值
+    unique_examples = []
+    for value in examples:
+        text = _short(value)
+        if text not in unique_examples:
+            unique_examples.append(text)
+        if len(unique_examples) >= _EXAMPLE_COUNT:
+            break
+    profile["examples"] = unique_examples
+    return profile
+
+
+def profile_table(table: ColumnarTable) -> list[dict[str, Any]]:
+    return [profile_column(table, name) for name in table.column_names]
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估计 token 数：ASCII 约 4 个字符 1 个 token，中文等非 ASCII 字符按 1 个 token 计"""
+    ascii_count = sum(1 for char in text if ord(char) < 128)
+    return (ascii_count + 3) // 4 + (len(text) - ascii_count)
+
+
+def _render_column(profile: dict[str, Any], detail: int) -> str:
+    """detail: 2 完整，1 只保留一个示例，0 只有字段名和类型"""
+    parts = [str(profile["name"]), profile["type"]]
+    if detail >= 1:
+        distinct = profile["distinct"]
+        parts.append(f"非空{profile['non_null']}")
+        parts.append(f"不同值{'约' if profile['distinct_estimated'] else ''}{distinct}")
+        if profile["min"] is not None:
+            parts.append(f"范围{_format_number(profile['min'])}~{_format_number(profile['max'])}")
+        examples = profile["examples"][: _EXAMPLE_COUNT if detail >= 2 else 1]
+        if examples:
+            parts.append("示例:" + "/".join(examples))
+    return "|" + "|".join(parts) + "|"
+
+
+def render_profile(table: ColumnarTable, token_budget: int = 1500, sample_rows: int = 5) -> str:
+    """
+    在 token 预算内渲染字段概况，预算不足时依次减少示例、只保留字段名和类型、省略末尾的字段；
+    预算有剩余时再附上前几行不重复的样例数据。
+    """
+    profiles = profile_table(table)
+    header = f"共{len(table)}行{len(profiles)}列，字段概况（字段|类型|非空数|不同值数|数值范围|示例）:"
+    budget = token_budget - estimate_tokens(header)
+
+    lines: list[str] = []
+    for detail in (2, 1, 0):
+        lines = [_render_column(profile, detail) for profile in profiles]
+        if sum(estimate_tokens(line) + 1 for line in lines) <= budget:
+            break
+    else:
+        kept = []
+        used = 0
+        for line in lines:
+            cost = estimate_tokens(line) + 1
+            if used + cost > budget - 16:
+                break
+            kept.append(line)
+            used += cost
+        lines = kept + [f"……另有{len(profiles) - len(kept)}个字段未列出"]
+
+    text = "\n".join([header, *lines])
+    remaining = token_budget - estimate_tokens(text)
+    if sample_rows and remaining > 0:
+        sample = table.to_markdown_sample(max_rows=sample_rows)
+        sample_lines = [line for line in sample.split("\n") if line != "|"]
+        # 样例按整行截断，至少需要表头和一行数据
+        while len(sample_lines) > 2 and estimate_tokens("\n".join(sample_lines)) + 8 > remaining:
+            sample_lines.pop()
+        if len(sample_lines) > 1 and estimate_tokens("\n".join(sample_lines)) + 8 <= remaining:
+            text += "\n样例数据:\n" + "\n".join(sample_lines)
+    return text
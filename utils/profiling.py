@@ -0,0 +1,149 @@
+"""
+慢请求剖析：开启后每次调用都在 cProfile 和 tracemalloc 下执行，只有耗时或峰值内存超过阈值的请求才把结果写入本地目录，
+供离线分析（如分组透视循环、literal_eval 回退等热点）。目录中只保留最近的若干份，旧文件自动删除。
+
+通过环境变量开启（默认关闭，未设置目录时没有任何开销）：
+  JSON2CHART_PROFILE_DIR       剖析结果目录，设置后即开启
+  JSON2CHART_PROFILE_MIN_MS    耗时阈值（毫秒），默认 1000
+  JSON2CHART_PROFILE_MIN_MB    峰值内存阈值（MB），默认 0 表示不按内存判断
+  JSON2CHART_PROFILE_KEEP      最多保留的请求份数，默认 20
+
+每份结果包括 <名称>.prof（pstats 格式，可用 snakeviz 等工具查看）和 <名称>.txt（耗时最多的函数与分配内存最多的代码行）。
+cProfile 只记录调用所在线程；并行生成的图表在线程池中执行，其耗时只体现在等待结果的调用上。
+同一时刻只剖析一个请求，其他并发请求照常执行、不剖析。
+剖析本身会明显拖慢执行（tracemalloc 尤甚），只应在排查问题时开启。
+"""
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Any, Iterator
+
+_TOP_FUNCTIONS = 40
+_TOP_ALLOCATIONS = 25
+
+
+class RequestProfiler:
+    def __init__(self, directory: str, min_ms: float = 1000, min_peak_bytes: int = 0, keep: int = 20):
+        self.directory = directory
+        self.min_ms = min_ms
+        self.min_peak_bytes = min_peak_bytes
+        self.keep = max(int(keep), 1)
+        # cProfile 和 tracemalloc 都是进程级的状态，同一时刻只剖析一个请求
+        self._busy = threading.Lock()
+        self._counter = 0
+
+    @contextmanager
+    def profile(self, label: str = "") -> Iterator[dict[str, Any]]:
+        """
+        在剖析下执行 with 语句块，产出的 dict 在退出后包含 elapsed_ms、peak_bytes，
+        写入了剖析结果时还包含 path（不含扩展名）。
+        """
+        result: dict[str, Any] = {}
+        if not self._busy.acquire(blocking=False):
+            yield result
+            return
+        try:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            else:
+                tracemalloc.reset_peak()
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # 已有其他剖析工具在运行（如调试器），本次不剖析
+                profiler = None
+                if started_tracing:
+                    tracemalloc.stop()
+            if profiler is None:
+                yield result
+                return
+            started = time.perf_counter()
+            try:
+                yield result
+            finally:
+                profiler.disable()
+                result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+                result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+                snapshot = tracemalloc.take_snapshot() if self._exceeds(result) else None
+                if started_tracing:
+                    tracemalloc.stop()
+                if snapshot is not None:
+                    result["path"] = self._dump(label, profiler, snapshot, result)
+        finally:
+            self._busy.release()
+
+    def _exceeds(self, result: dict[str, Any]) -> bool:
+        if result["elapsed_ms"] >= self.min_ms:
+            return True
+        return bool(self.min_peak_bytes) and result["peak_bytes"] >= self.min_peak_bytes
+
+    def _dump(self, label: str, profiler: cProfile.Profile, snapshot: tracemalloc.Snapshot, result: dict[str, Any]) -> str | None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # 调用方已持有 _busy 锁，计数无需另外加锁
+            self._counter += 1
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self._counter:04d}"
+            path = os.path.join(self.directory, name)
+            profiler.dump_stats(path + ".prof")
+            with open(path + ".txt", "w", encoding="utf-8") as f:
+                f.write(self._summary(label, profiler, snapshot, result))
+            self._rotate()
+            return path
+        except OSError:
+            # 写入失败不影响请求本身
+            return None
+
+    def _summary(self, label: str, profiler: cProfile.Profile, snapshot: tracemalloc.Snapshot, result: dict[str, Any]) -> str:
+        out = io.StringIO()
+        out.write(f"请求: {label}\n耗时: {result['elapsed_ms']} ms\n峰值内存: {result['peak_bytes'] / 1024 / 1024:.2f} MB\n\n")
+        out.write(f"== 累计耗时最多的 {_TOP_FUNCTIONS} 个函数 ==\n")
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(_TOP_FUNCTIONS)
+        out.write(f"\n== 请求结束时占用内存最多的 {_TOP_ALLOCATIONS} 处代码 ==\n")
+        for stat in snapshot.statistics("lineno")[:_TOP_ALLOCATIONS]:
+            out.write(f"{stat}\n")
+        return out.getvalue()
+
+    def _rotate(self) -> None:
+        """按请求（.prof 和 .txt 同名为一份）只保留最新的 keep 份"""
+        stems: dict[str, float] = {}
+        for entry in os.scandir(self.directory):
+            stem, ext = os.path.splitext(entry.name)
+            if ext in (".prof", ".txt"):
+                stems[stem] = max(stems.get(stem, 0.0), entry.stat().st_mtime)
+        for stem in sorted(stems, key=lambda s: (stems[s], s))[:-self.keep]:
+            for ext in (".prof", ".txt"):
+                try:
+                    os.remove(os.path.join(self.directory, stem + ext))
+                except FileNotFoundError:
+                    pass
+
+
+_profiler: RequestProfiler | None = None
+
+
+def configure(directory: str | None, min_ms: float = 1000, min_peak_bytes: int = 0, keep: int = 20) -> None:
+    """开启（directory 不为空）或关闭慢请求剖析"""
+    global _profiler
+    _profiler = RequestProfiler(directory, min_ms, min_peak_bytes, keep) if directory else None
+
+
+def profile_request(label: str = "") -> Any:
+    """未开启剖析时返回空的上下文管理器"""
+    if _profiler is None:
+        return nullcontext({})
+    return _profiler.profile(label)
+
+
+configure(
+    os.environ.get("JSON2CHART_PROFILE_DIR"),
+    min_ms=float(os.environ.get("JSON2CHART_PROFILE_MIN_MS") or 1000),
+    min_peak_bytes=int(float(os.environ.get("JSON2CHART_PROFILE_MIN_MB") or 0) * 1024 * 1024),
+    keep=int(os.environ.get("JSON2CHART_PROFILE_KEEP") or 20),
+)
@@ -1,4 +1,6 @@
 from utils.chart import get_colors, auto_detect_keys
+from utils.columnar import as_table
+from utils.pivot import pivot_groups
 from utils.theme import (
     get_theme_global,
     RADAR_ITEM_STYLE,
@@ -6,9 +8,9 @@ from utils.theme import (
     RADAR_SYMBOL,
     RADAR_SYMBOL_SIZE,
 )
-import json
+from utils.serializer import dumps
 
-def generate_echarts_radar(
+def build_echarts_radar(
     data_list: list,
     name_key: str = None,
     value_keys: list = None,
@@ -17,16 +19,17 @@ def generate_echarts_radar(
     saturation=0.5,  # 新增饱和度参数
     brightness=0.95,  # 新增亮度参数
     group_key: str = None  # 新增分组参数
-) -> str:
+) -> dict:
     """生成通用 ECharts 雷达图配置，支持自动推断字段和多维数据，支持按字段分组"""
-    if not data_list:
+    table = as_table(data_list)
+    if not table:
         raise ValueError("数据列表不能为空")
     
     if not name_key:
-        name_key, _ = auto_detect_keys(data_list)
+        name_key, _ = auto_detect_keys(table)
     
     if not value_keys:
-        _, value_key = auto_detect_keys(data_list)
+        _, value_key = auto_detect_keys(table)
         value_keys = [value_key]
     
     if series_names is None:
@@ -38,11 +41,17 @@ def generate_echarts_radar(
         required_fields.append(group_key)
     
     for field in required_fields:
-        if field not in data_list[0]:
+        if field not in table:
             raise KeyError(f"数据中未找到字段: '{field}'")
     
     # 准备雷达图的数据结构
-    indicators = [{"name": value_key, "max": max(item[value_key] for item in data_list) * 1.1} for value_key in value_keys]
+    name_values = table.values(name_key)
+    value_columns = {value_key: table.values(value_key) for value_key in value_keys}
+    # 整列为空值时 max 默认为 0，不因空列报错
+    indicators = [
+        {"name": value_key, "max": max((v for v in value_columns[value_key] if v is not None), default=0) * 1.1}
+        for value_key in value_keys
+    ]
     
     # 自动生成标题
     if not title:
@@ -81,8 +90,8 @@ def generate_echarts_radar(
     # 按group_key分组生成多系列雷达图
     if group_key:
         # 获取所有唯一的分组值
-        groups = list(set(item[group_key] for item in data_list))
-        groups.sort()  # 排序确保展示顺序一致
+        pivot = pivot_groups(table.values(group_key))
+        groups = pivot.groups  # 已排序，确保展示顺序一致
         
         # 使用主题色板
         total_series = len(groups) * len(value_keys)
@@ -93,9 +102,7 @@ def generate_echarts_radar(
         color_index = 0
         
         # 为每个分组-指标组合生成一个系列
-        for group in groups:
-            # 过滤出该分组的数据
-            group_data = [item for item in data_list if item[group_key] == group]
+        for group, group_rows in zip(groups, pivot.group_rows):
             
             # 为每个value_key生成一个系列
             for i, value_key in enumerate(value_keys):
@@ -105,11 +112,11 @@ def generate_echarts_radar(
                 
                 # 为该分组-指标组合构建雷达图数据
                 group_series_data = []
-                for item in group_data:
-                    item_data = [item[value_key]]
+                for row in group_rows:
+                    item_data = [value_columns[value_key][row]]
                     group_series_data.append({
                         "value": item_data,
-                        "name": item[name_key]
+                        "name": name_values[row]
                     })
                 
                 series_config = {
@@ -138,19 +145,19 @@ def generate_echarts_radar(
     else:
         # 原有逻辑 - 不分组的雷达图
         series_data = []
-        for item in data_list:
-            item_data = [item[value_key] for value_key in value_keys]
+        for row, name in enumerate(name_values):
+            item_data = [value_columns[value_key][row] for value_key in value_keys]
             series_data.append({
                 "value": item_data,
-                "name": item[name_key]
+                "name": name
             })
         
         # 使用主题色板
-        color_list = get_colors(len(data_list), saturation=saturation, brightness=brightness)
+        color_list = get_colors(len(table), saturation=saturation, brightness=brightness)
 
         config["legend"] = {
             **config["legend"],
-            "data": [item[name_key] for item in data_list],
+            "data": list(name_values),
         }
         series_config = {
             "name": series_names[0],
@@ -165,4 +172,9 @@ def generate_echarts_radar(
         config["series"].append(series_config)
         config["color"] = color_list
     
-    return json.dumps(config, indent=4, ensure_ascii=False)
\ No newline at end of file
+    return config
+
+
+def generate_echarts_radar(*args, **kwargs) -> str:
+    """参数与 build_echarts_radar 相同，返回序列化后的 JSON 字符串"""
+    return dumps(build_echarts_radar(*args, **kwargs))
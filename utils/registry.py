@@ -0,0 +1,132 @@
+"""
+图表类型注册表：每种图表声明生成函数、需要的参数、数值字段个数要求，以及是否支持 group_key、单行宽表转置。
+工具按图表类型直接查表分派；生成函数所在的模块在第一次用到该图表类型时才导入。
+
+新增图表类型（如热力图、矩形树图）无需修改工具代码：在任意模块中调用 register_chart() 注册，
+并把模块名加入环境变量 JSON2CHART_CHART_PLUGINS（逗号分隔），注册表首次使用时会导入这些模块。
+生成函数的签名约定为 builder(table, name_key=..., title=..., saturation=..., brightness=..., **params) -> dict。
+"""
+import importlib
+import os
+import threading
+from typing import Any, Callable
+
+# 每个生成函数都会收到的参数
+COMMON_PARAMS = ("name_key", "title", "saturation", "brightness")
+
+
+class ChartSpec:
+    """
+    builder 为生成函数，或 "模块:函数名" 形式的字符串（首次使用时导入）。
+    params 为除 COMMON_PARAMS 外需要传给生成函数的参数名，调用时只传入其中可用的参数；
+    params 中包含 group_key 即表示支持按字段分组；min_value_keys 为 0 时由生成函数自动检测数值字段。
+    """
+
+    def __init__(
+        self,
+        chart_type: str,
+        builder: str | Callable[..., dict[str, Any]],
+        params: tuple[str, ...] = ("value_keys", "series_names"),
+        min_value_keys: int = 0,
+        arity_error: str | None = None,
+        wide_table: bool = False,
+    ):
+        self.chart_type = chart_type
+        self._builder = builder
+        self.params = params
+        self.min_value_keys = min_value_keys
+        self.arity_error = arity_error or f"{chart_type}需要至少{min_value_keys}个数值字段"
+        self.wide_table = wide_table
+        self._lock = threading.Lock()
+
+    @property
+    def builder(self) -> Callable[..., dict[str, Any]]:
+        if isinstance(self._builder, str):
+            with self._lock:
+                if isinstance(self._builder, str):
+                    module_name, function_name = self._builder.split(":")
+                    self._builder = getattr(importlib.import_module(module_name), function_name)
+        return self._builder
+
+    @property
+    def supports_group_key(self) -> bool:
+        return "group_key" in self.params
+
+    def build(self, table: Any, **available: Any) -> dict[str, Any]:
+        """从可用参数中挑出该图表需要的参数调用生成函数"""
+        kwargs = {name: available[name] for name in COMMON_PARAMS + self.params if name in available}
+        return self.builder(table, **kwargs)
+
+
+_registry: dict[str, ChartSpec] = {}
+_plugins_loaded = False
+_plugins_lock = threading.Lock()
+
+
+def register_chart(spec: ChartSpec) -> None:
+    """注册（或覆盖）一种图表类型"""
+    _registry[spec.chart_type] = spec
+
+
+def _load_plugins() -> None:
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+    with _plugins_lock:
+        if _plugins_loaded:
+            return
+        for module_name in (os.environ.get("JSON2CHART_CHART_PLUGINS") or "").split(","):
+            if module_name.strip():
+                importlib.import_module(module_name.strip())
+        _plugins_loaded = True
+
+
+def get_spec(chart_type: Any) -> ChartSpec | None:
+    _load_plugins()
+    return _registry.get(chart_type) if isinstance(chart_type, str) else None
+
+
+def chart_types() -> tuple[str, ...]:
+    _load_plugins()
+    return tuple(_registry)
+
+
+def get_builder(chart_type: str) -> Callable[..., dict[str, Any]]:
+    """返回图表类型对应的生成函数，首次调用时导入所在模块"""
+    spec = get_spec(chart_type)
+    if spec is None:
+        raise ValueError(f"不支持的图表类型: {chart_type}")
+    return spec.builder
+
+
+_DOWNSAMPLE_PARAMS = ("downsample", "max_points")
+
+for _spec in (
+    ChartSpec("饼状图", "utils.pie:build_echarts_pie", params=("value_keys", "series_names", "use_dataset", "max_categories"), wide_table=True),
+    ChartSpec("柱状图", "utils.bar:build_echarts_bar", params=("value_keys", "series_names", "group_key", "use_dataset"), wide_table=True),
+    ChartSpec("折线图", "utils.line:build_echarts_line", params=("value_keys", "series_names", "group_key", *_DOWNSAMPLE_PARAMS, "use_dataset"), wide_table=True),
+    ChartSpec(
+        "雷达图",
+        "utils.radar:build_echarts_radar",
+        params=("value_keys", "series_names", "group_key"),
+        min_value_keys=3,
+        arity_error="雷达图需要至少三个数值字段进行多维度分析",
+        wide_table=True,
+    ),
+    ChartSpec("漏斗图", "utils.funnel:build_echarts_funnel", params=("value_keys", "series_names", "use_dataset", "max_categories"), wide_table=True),
+    ChartSpec(
+        "散点图",
+        "utils.scatter:build_echarts_scatter",
+        params=("value_keys", "series_names", "group_key", "large_threshold", "keep_names"),
+        min_value_keys=1,
+        arity_error="散点图需要至少一个数值字段",
+    ),
+    ChartSpec("环形图", "utils.donut:build_echarts_donut", params=("value_keys", "center_text", "use_dataset", "max_categories"), wide_table=True),
+    ChartSpec(
+        "双轴图",
+        "utils.dual_axis:build_echarts_dual_axis",
+        params=("bar_value_keys", "line_value_keys", "bar_names", "line_names", *_DOWNSAMPLE_PARAMS, "use_dataset"),
+    ),
+    ChartSpec("堆叠柱状图", "utils.stacked_bar:build_echarts_stacked_bar", params=("value_keys", "series_names", "group_key", "use_dataset"), wide_table=True),
+):
+    register_chart(_spec)
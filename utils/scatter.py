@@ -1,8 +1,15 @@
+import numpy as np
+
 from utils.chart import get_colors, auto_detect_keys
+from utils.columnar import as_table
+from utils.pivot import pivot_groups
 from utils.theme import get_theme_global, VALUE_AXIS, SPLIT_LINE_STYLE, GRID_STYLE
-import json
+from utils.serializer import dumps
+
+# 大数据量模式下每帧渲染的点数
+_PROGRESSIVE_CHUNK_SIZE = 20000
 
-def generate_echarts_scatter(
+def build_echarts_scatter(
     data_list: list,
     name_key: str = None,
     value_keys: list = None,
@@ -10,27 +17,33 @@ def generate_echarts_scatter(
     series_names: list = None,
     saturation=0.5,  # 新增饱和度参数
     brightness=0.95,  # 新增亮度参数
-    group_key: str = None  # 新增分组字段参数
-) -> str:
-    """生成通用 ECharts 散点图配置，支持自动推断字段、多维数据和分组显示"""
-    if not data_list:
+    group_key: str = None,  # 新增分组字段参数
+    large_threshold: int = None,
+    keep_names: bool = False
+) -> dict:
+    """
+    生成通用 ECharts 散点图配置，支持自动推断字段、多维数据和分组显示。
+    数据行数达到 large_threshold 时切换为大数据量模式，见 _apply_large_mode。
+    """
+    table = as_table(data_list)
+    if not table:
         raise ValueError("数据列表不能为空")
     
     if not name_key:
-        name_key, _ = auto_detect_keys(data_list)
+        name_key, _ = auto_detect_keys(table)
     
     if not value_keys:
         # 散点图需要至少两个值字段
-        _, value_key = auto_detect_keys(data_list)
+        _, value_key = auto_detect_keys(table)
         # 尝试找第二个数值字段作为y轴
-        numeric_keys = [k for k, v in data_list[0].items() if isinstance(v, (int, float)) and k != value_key]
+        numeric_keys = [k for k, v in table.row(0).items() if isinstance(v, (int, float)) and k != value_key]
         if numeric_keys:
             value_keys = [value_key, numeric_keys[0]]
         else:
             value_keys = [value_key, value_key]  # 如果只有一个数值字段，就用它作为两个轴
     elif len(value_keys) < 2:
         # 如果只提供了一个值字段，找另一个数值字段
-        numeric_keys = [k for k, v in data_list[0].items() if isinstance(v, (int, float)) and k != value_keys[0]]
+        numeric_keys = [k for k, v in table.row(0).items() if isinstance(v, (int, float)) and k != value_keys[0]]
         if numeric_keys:
             value_keys.append(numeric_keys[0])
         else:
@@ -41,7 +54,7 @@ def generate_echarts_scatter(
     
     # 验证字段存在
     for value_key in value_keys[:2]:  # 散点图只需要前两个值字段
-        if value_key not in data_list[0] or name_key not in data_list[0]:
+        if value_key not in table or name_key not in table:
             raise KeyError(f"数据中未找到推断的字段: '{value_key}' 或 '{name_key}'")
     
     # 自动生成标题
@@ -73,27 +86,35 @@ def generate_echarts_scatter(
         "series": [],
     }
 
+    large_mode = bool(large_threshold) and len(table) >= large_threshold
+    if large_mode:
+        config["animation"] = False
+    # 大数据量模式下只有 keep_names 时才在数据项中保留名称
+    point_name_key = name_key if keep_names and name_key in table else None
+
     # 处理分组逻辑
-    if group_key and group_key in data_list[0]:
+    x_values = table.values(value_keys[0])
+    y_values = table.values(value_keys[1])
+    # 如果有name_key，添加名称信息用于tooltip
+    name_values = table.values(name_key) if name_key in table else None
+
+    if group_key and group_key in table:
         # 获取所有唯一的分组值
-        groups = set(item.get(group_key) for item in data_list)
-        groups = sorted(groups)  # 排序确保展示顺序一致
+        pivot = pivot_groups(table.values(group_key))
+        groups = pivot.groups  # 已排序，确保展示顺序一致
         colors = get_colors(len(groups), saturation=saturation, brightness=brightness)
         
         # 为每个分组创建系列
-        for i, group_value in enumerate(groups):
-            group_data = []
-            for item in data_list:
-                if item.get(group_key) == group_value:
-                    # 确保我们有足够的value_keys来获取x和y值
-                    if len(value_keys) >= 2:
-                        x_val = item[value_keys[0]]
-                        y_val = item[value_keys[1]]
-                        data_point = [x_val, y_val]
-                        # 如果有name_key，添加名称信息用于tooltip
-                        if name_key in item:
-                            data_point.append(item[name_key])
-                        group_data.append(data_point)
+        for i, (group_value, group_rows) in enumerate(zip(groups, pivot.group_rows)):
+            if large_mode:
+                group_data = _numeric_points(table, value_keys[0], value_keys[1], group_rows, name_key=point_name_key)
+            else:
+                group_data = []
+                for row in group_rows:
+                    data_point = [x_values[row], y_values[row]]
+                    if name_values is not None:
+                        data_point.append(name_values[row])
+                    group_data.append(data_point)
             
             series_config = {
                 "name": str(group_value),
@@ -117,6 +138,8 @@ def generate_echarts_scatter(
                                  (f"<br/>{name_key}: {{{{c[2]}}}}" if len(group_data) > 0 and len(group_data[0]) > 2 else "")
                 }
             }
+            if large_mode:
+                _apply_large_mode(series_config, large_threshold)
             config["series"].append(series_config)
         
         # 添加图例
@@ -131,15 +154,12 @@ def generate_echarts_scatter(
         }
     else:
         # 不分组的传统散点图逻辑
-        scatter_data = []
-        for item in data_list:
-            x_val = item[value_keys[0]]
-            y_val = item[value_keys[1]]
-            data_point = [x_val, y_val]
-            # 如果有name_key，添加名称信息用于tooltip
-            if name_key in item:
-                data_point.append(item[name_key])
-            scatter_data.append(data_point)
+        if large_mode:
+            scatter_data = _numeric_points(table, value_keys[0], value_keys[1], name_key=point_name_key)
+        elif name_values is not None:
+            scatter_data = [list(point) for point in zip(x_values, y_values, name_values)]
+        else:
+            scatter_data = [list(point) for point in zip(x_values, y_values)]
         
         color_list = get_colors(1, saturation=saturation, brightness=brightness)
         
@@ -165,6 +185,44 @@ def generate_echarts_scatter(
                              (f"<br/>{name_key}: {{{{c[2]}}}}" if len(scatter_data) > 0 and len(scatter_data[0]) > 2 else "")
             }
         }
+        if large_mode:
+            _apply_large_mode(series_config, large_threshold)
         config["series"].append(series_config)
     
-    return json.dumps(config, indent=4, ensure_ascii=False)
\ No newline at end of file
+    return config
+
+
+def _numeric_points(table, x_key: str, y_key: str, rows: list = None, name_key: str = None) -> list:
+    """
+    按列直接拼出 [x, y] 数值对，跳过任一坐标为空的点；指定 name_key 时为 [x, y, 名称]，
+    与普通模式的数据项结构一致，提示框的 {c[2]} 仍能显示名称。
+    """
+    x_array = table.column(x_key)
+    y_array = table.column(y_key)
+    valid = ~(table.null_mask(x_key) | table.null_mask(y_key))
+    if rows is None:
+        point_rows = np.flatnonzero(valid)
+    else:
+        rows = np.asarray(rows, dtype=np.int64)
+        point_rows = rows[valid[rows]]
+    # 两列分别转换，整数列不会被提升为浮点数
+    columns = [x_array[point_rows].tolist(), y_array[point_rows].tolist()]
+    if name_key is not None:
+        columns.append(table.values(name_key, rows=point_rows))
+    return list(map(list, zip(*columns)))
+
+
+def _apply_large_mode(series_config: dict, large_threshold: int) -> None:
+    """大数据量模式：开启 ECharts large/progressive 渲染"""
+    series_config["large"] = True
+    series_config["largeThreshold"] = large_threshold
+    series_config["progressive"] = _PROGRESSIVE_CHUNK_SIZE
+    series_config["progressiveThreshold"] = large_threshold
+    series_config["symbolSize"] = 4
+    # large 模式下不支持逐点高亮
+    series_config.pop("emphasis", None)
+
+
+def generate_echarts_scatter(*args, **kwargs) -> str:
+    """参数与 build_echarts_scatter 相同，返回序列化后的 JSON 字符串"""
+    return dumps(build_echarts_scatter(*args, **kwargs))
@@ -0,0 +1,102 @@
+"""
+可插拔的 JSON 序列化/反序列化层。
+安装了原生加速库（orjson）时自动使用，否则回退到标准库 json；orjson 用于解析和紧凑输出，
+带缩进的输出两种后端都由标准库生成（4 空格缩进），切换后端不改变输出格式。
+也可以通过环境变量 JSON2CHART_JSON_BACKEND 或 set_backend() 指定后端，register_backend() 注册自定义后端。
+"""
+import json
+import os
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 取决于运行环境
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    # 兼容 NumPy 标量和数组
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _stdlib_dumps(obj: Any, compact: bool = False) -> str:
+    if compact:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default)
+    return json.dumps(obj, indent=4, ensure_ascii=False, default=_default)
+
+
+def _stdlib_loads(text: str | bytes) -> Any:
+    return json.loads(text)
+
+
+def _orjson_dumps(obj: Any, compact: bool = False) -> str:
+    # orjson 只支持 2 空格缩进，带缩进的输出仍交给标准库，保持原有的 4 空格格式；紧凑输出走 orjson
+    if not compact:
+        return _stdlib_dumps(obj)
+    try:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode("utf-8")
+    except TypeError:
+        # 超出 64 位的整数等 orjson 不支持的类型，交给标准库处理
+        return _stdlib_dumps(obj, compact=compact)
+
+
+def _orjson_loads(text: str | bytes) -> Any:
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        # NaN/Infinity 等非标准写法只有标准库能解析
+        return json.loads(text)
+
+
+_BACKENDS: dict[str, tuple[Callable[..., str], Callable[[str | bytes], Any]]] = {
+    "stdlib": (_stdlib_dumps, _stdlib_loads),
+}
+if orjson is not None:
+    _BACKENDS["orjson"] = (_orjson_dumps, _orjson_loads)
+
+# 按优先级自动选择的后端
+_PREFERRED_BACKENDS = ("orjson", "stdlib")
+
+
+def register_backend(name: str, dumps_func: Callable[..., str], loads_func: Callable[[str | bytes], Any]) -> None:
+    """注册自定义后端，dumps_func 需支持 compact 关键字参数"""
+    _BACKENDS[name] = (dumps_func, loads_func)
+
+
+def available_backends() -> list[str]:
+    return list(_BACKENDS.keys())
+
+
+def set_backend(name: str | None = None) -> str:
+    """切换当前后端，name 为空时按优先级自动选择，返回实际使用的后端名称"""
+    global _current_name, _current_dumps, _current_loads
+    if name:
+        if name not in _BACKENDS:
+            raise ValueError(f"不支持的 JSON 后端: {name}，可选: {', '.join(_BACKENDS)}")
+    else:
+        name = next(n for n in _PREFERRED_BACKENDS if n in _BACKENDS)
+    _current_name = name
+    _current_dumps, _current_loads = _BACKENDS[name]
+    return name
+
+
+def get_backend() -> str:
+    return _current_name
+
+
+def dumps(obj: Any, compact: bool = False) -> str:
+    """序列化为 JSON 字符串（不转义非 ASCII 字符），compact=True 时输出不带缩进和多余空白的紧凑格式"""
+    return _current_dumps(obj, compact=compact)
+
+
+def loads(text: str | bytes) -> Any:
+    return _current_loads(text)
+
+
+_current_name = ""
+_current_dumps, _current_loads = _BACKENDS["stdlib"]
+set_backend(os.environ.get("JSON2CHART_JSON_BACKEND") or None)
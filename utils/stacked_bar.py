@@ -1,28 +1,36 @@
 from utils.chart import get_colors, auto_detect_keys
+from utils.columnar import as_table
+from utils.pivot import pivot_groups
+from utils.dataset import dataset_from_table, axis_encode
 from utils.theme import get_theme_global, VALUE_AXIS, CATEGORY_AXIS, GRID_STYLE, BAR_ITEM_STYLE
-import json
+from utils.serializer import dumps
 
-def generate_echarts_stacked_bar(
+def build_echarts_stacked_bar(
     data_list: list,
     name_key: str = None,
     value_keys: list = None,
     title: str = None,
     series_names: list = None,
     saturation=0.5,
-    brightness=0.95
-) -> str:
+    brightness=0.95,
+    group_key=None,
+    use_dataset: bool = False
+) -> dict:
     """
     生成 ECharts 堆叠柱状图配置。
     参考 utils/bar.py 实现，强制开启堆叠 (stack: 'total')。
+    指定 group_key 时每个分组-指标组合一个系列，同一指标的各分组堆叠在同一根柱子上。
+    use_dataset 为 True 且未分组时，数据写入 dataset.source，各系列通过 encode 引用字段。
     """
-    if not data_list:
+    table = as_table(data_list)
+    if not table:
         raise ValueError("数据列表不能为空")
     
     if not name_key:
-        name_key, _ = auto_detect_keys(data_list)
+        name_key, _ = auto_detect_keys(table)
     
     if not value_keys:
-        _, value_key = auto_detect_keys(data_list)
+        _, value_key = auto_detect_keys(table)
         value_keys = [value_key]
     
     if series_names is None:
@@ -30,10 +38,38 @@ def generate_echarts_stacked_bar(
     
     # 验证字段存在
     required_fields = [name_key] + value_keys
+    if group_key:
+        required_fields.append(group_key)
     for field in required_fields:
-        if field not in data_list[0]:
+        if field not in table:
             raise KeyError(f"数据中未找到字段: '{field}'")
     
+    # 每项为 (系列名, 堆叠分组, 系列数据来源：data 或 encode)
+    series_specs = []
+    dataset = None
+    if group_key:
+        # 一次建立 (分组, x轴值) -> 行下标 的索引，缺失的值用0表示
+        pivot = pivot_groups(table.values(group_key), table.values(name_key))
+        x_axis_data = pivot.x_axis_data
+        aligned = [pivot.series(table.values(value_key), fill=0) for value_key in value_keys]
+        series_by_value_key = dict(zip(value_keys, aligned))
+        for group_index, group in enumerate(pivot.groups):
+            for i, value_key in enumerate(value_keys):
+                series_name = series_names[i] if i < len(series_names) else value_key
+                stack = series_name if len(value_keys) > 1 else "total"
+                series_specs.append((f"{group}-{series_name}", stack, {"data": series_by_value_key[value_key][group_index]}))
+    elif use_dataset:
+        # 数据只写入一次 dataset.source，x 轴和各系列通过 encode 引用字段
+        dataset = dataset_from_table(table, [name_key] + value_keys)
+        x_axis_data = None
+        for i, value_key in enumerate(value_keys):
+            series_specs.append((series_names[i], "total", {"encode": axis_encode(name_key, value_key)}))
+    else:
+        x_axis_data = table.values(name_key)
+        for i, value_key in enumerate(value_keys):
+            series_specs.append((series_names[i], "total", {"data": table.values(value_key)}))
+    legend_data = [spec[0] for spec in series_specs]
+
     # 构造配置
     global_theme = get_theme_global()
     config = {
@@ -46,32 +82,30 @@ def generate_echarts_stacked_bar(
             "axisPointer": {"type": "shadow"}, # 堆叠图通常使用 shadow 指示器
             **global_theme["tooltip"],
         },
-        "legend": {**global_theme["legend"], "data": series_names},
+        "legend": {**global_theme["legend"], "data": legend_data},
         "grid": GRID_STYLE,
         "xAxis": {
             "type": "category",
-            "data": [item[name_key] for item in data_list],
             **CATEGORY_AXIS,
             "axisTick": {"alignWithLabel": True, **CATEGORY_AXIS.get("axisTick", {})},
         },
         "yAxis": {"type": "value", **VALUE_AXIS},
         "series": [],
     }
+    if dataset is not None:
+        config["dataset"] = dataset
+    else:
+        config["xAxis"]["data"] = x_axis_data
     
     # 使用主题色板
-    color_list = get_colors(len(value_keys), saturation=saturation, brightness=brightness)
-    
-    series_data_list = []
-    for value_key in value_keys:
-        series_data = [item[value_key] for item in data_list]
-        series_data_list.append(series_data)
-        
-    for i, series_data in enumerate(series_data_list):
+    color_list = get_colors(len(series_specs), saturation=saturation, brightness=brightness)
+
+    for i, (series_name, stack, series_source) in enumerate(series_specs):
         series_config = {
-            "name": series_names[i],
+            "name": series_name,
             "type": "bar",
-            "stack": "total", # 开启堆叠
-            "data": series_data,
+            "stack": stack, # 开启堆叠
+            **series_source,
             "itemStyle": {
                 **BAR_ITEM_STYLE,
                 "color": color_list[i],
@@ -88,7 +122,15 @@ def generate_echarts_stacked_bar(
     
     # 更新标题
     if not title:
-        title = f"{name_key} {', '.join(value_keys)}堆叠柱状图"
+        if group_key:
+            title = f"不同{group_key}的{', '.join(value_keys)}堆叠柱状图"
+        else:
+            title = f"{name_key} {', '.join(value_keys)}堆叠柱状图"
     config["title"]["text"] = title
     
-    return json.dumps(config, indent=4, ensure_ascii=False)
+    return config
+
+
+def generate_echarts_stacked_bar(*args, **kwargs) -> str:
+    """参数与 build_echarts_stacked_bar 相同，返回序列化后的 JSON 字符串"""
+    return dumps(build_echarts_stacked_bar(*args, **kwargs))
@@ -0,0 +1,124 @@
+import ast
+import json
+import re
+from typing import Any, Iterator
+
+# 只检查输入的前缀来判断需要哪种修复，避免为整份数据生成多份修复后的副本
+_PREFIX_SIZE = 64 * 1024
+
+# 字符串之外需要关注的结构字符
+_STRUCTURE_PATTERNS = {
+    "json": re.compile(r'[\[\]{},"]'),
+    "python": re.compile(r"[\[\]{},\"']"),
+    "escaped": re.compile(r'[\[\]{},]|\\"'),
+}
+# 数组元素之间允许出现的空白、不间断空格、字面量 \n 和逗号
+_SEPARATORS = re.compile(r"(?:\s|\\n|,)*")
+_DECODER = json.JSONDecoder()
+_STRING_PATTERNS = {
+    '"': re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL),
+    "'": re.compile(r"'(?:[^'\\]|\\.)*'", re.DOTALL),
+}
+
+
+def detect_stream_mode(text: str) -> str | None:
+    """
+    根据有限长度的前缀判断输入格式：
+    json     标准 JSON 数组
+    escaped  引号被转义的 JSON（如 [{\\"name\\": ...}]），需要逐条把 \\" 还原为 "
+    python   Python 字面量（单引号字符串），需要逐条 ast.literal_eval
+    顶层不是数组时返回 None，由调用方走原有的整体解析流程
+    """
+    prefix = text[:_PREFIX_SIZE].lstrip().replace("\xa0", " ")
+    if not prefix.startswith("["):
+        return None
+    match = re.search(r"\\\"|\"|'", prefix)
+    if not match:
+        return "json"
+    return {'\\"': "escaped", '"': "json", "'": "python"}[match.group(0)]
+
+
+def _parse_item(item_text: str, mode: str) -> Any:
+    # 修复只作用于当前这一条数据，额外内存与单条数据大小相当
+    if mode == "escaped":
+        item_text = item_text.replace("\xa0", " ").replace("\\n", " ").replace('\\"', '"')
+    if mode != "python":
+        try:
+            return json.loads(item_text)
+        except json.JSONDecodeError:
+            pass
+    repaired = item_text.replace("\xa0", " ").replace("\\n", " ")
+    try:
+        return json.loads(repaired)
+    except json.JSONDecodeError:
+        pass
+    try:
+        return ast.literal_eval(repaired.strip())
+    except (SyntaxError, ValueError) as e:
+        raise ValueError(f"无法解析的数据项: {repaired[:50]}") from e
+
+
+def _scan_item_end(text: str, pos: int, mode: str) -> int:
+    """从 pos 开始跳过一个数组元素，返回其后分隔符（顶层的 , 或 ]）的位置"""
+    structure = _STRUCTURE_PATTERNS[mode]
+    depth = 0
+    while True:
+        match = structure.search(text, pos)
+        if match is None:
+            raise ValueError("数组未正确闭合")
+        token = match.group(0)
+        index = match.start()
+        if token in "[{":
+            depth += 1
+            pos = index + 1
+        elif token in "]}":
+            if depth == 0:
+                return index
+            depth -= 1
+            pos = index + 1
+        elif token == ",":
+            if depth == 0:
+                return index
+            pos = index + 1
+        elif token == '\\"':
+            end = text.find('\\"', index + 2)
+            if end < 0:
+                raise ValueError("字符串未正确闭合")
+            pos = end + 2
+        else:
+            string_match = _STRING_PATTERNS[token].match(text, index)
+            if string_match is None:
+                raise ValueError("字符串未正确闭合")
+            pos = string_match.end()
+
+
+def iter_array_items(text: str, mode: str | None = None) -> Iterator[Any]:
+    """
+    单次扫描顶层 JSON 数组，逐条解析数组元素并立即产出，
+    可以直接喂给 ColumnarTable.from_records 按列构建，不再生成整份输入的修复副本。
+    标准 JSON 元素直接在原字符串上 raw_decode；需要修复的元素才切出来单独修复后解析。
+    """
+    mode = mode or detect_stream_mode(text)
+    if mode is None:
+        raise ValueError("顶层数据不是数组，无法流式解析")
+
+    pos = text.index("[") + 1
+    length = len(text)
+    while True:
+        pos = _SEPARATORS.match(text, pos).end()
+        if pos >= length:
+            raise ValueError("数组未正确闭合")
+        if text[pos] == "]":
+            return
+        if mode == "json":
+            try:
+                item, end = _DECODER.raw_decode(text, pos)
+            except json.JSONDecodeError:
+                end = None
+            if end is not None:
+                yield item
+                pos = end
+                continue
+        end = _scan_item_end(text, pos, mode)
+        yield _parse_item(text[pos:end], mode)
+        pos = end